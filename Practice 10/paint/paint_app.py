@@ -10,6 +10,53 @@ TOOLBAR_HEIGHT = 110
 CANVAS_WIDTH = WINDOW_WIDTH
 CANVAS_HEIGHT = WINDOW_HEIGHT - TOOLBAR_HEIGHT
 
+GRID_CELL_SIZE = 64
+
+
+class ShapeGrid:
+    """Uniform grid over the canvas for finding shapes near a point.
+
+    Each shape is added with the bounding boxes of its parts (one per stroke
+    segment, or one for the whole outline). A cell maps shape keys to the
+    parts overlapping it, so a hit test only checks the shapes and stroke
+    segments in the cell under the mouse.
+    """
+
+    def __init__(self, cell_size: int = GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells: dict[tuple[int, int], dict[int, list[int]]] = {}
+        self.cells_of: dict[int, set[tuple[int, int]]] = {}
+        self.items: dict[int, dict[str, object]] = {}
+
+    def cells_for(self, rect: pygame.Rect) -> list[tuple[int, int]]:
+        size = self.cell_size
+        return [
+            (col, row)
+            for col in range(rect.left // size, rect.right // size + 1)
+            for row in range(rect.top // size, rect.bottom // size + 1)
+        ]
+
+    def add(self, key: int, shape: dict[str, object], boxes: list[tuple[int, pygame.Rect]]) -> None:
+        self.items[key] = shape
+        used = self.cells_of.setdefault(key, set())
+        for part, rect in boxes:
+            for cell in self.cells_for(rect):
+                self.cells.setdefault(cell, {}).setdefault(key, []).append(part)
+                used.add(cell)
+
+    def remove(self, key: int) -> None:
+        self.items.pop(key, None)
+        for cell in self.cells_of.pop(key, set()):
+            bucket = self.cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self.cells[cell]
+
+    def near(self, point: tuple[int, int]) -> dict[int, list[int]]:
+        """Return {key: parts} for the shapes whose boxes cover the point's cell."""
+        size = self.cell_size
+        return self.cells.get((point[0] // size, point[1] // size), {})
+
 
 class PaintApp:
     """Simple paint app with pen, rectangle, circle, eraser, and color palette."""
@@ -41,6 +88,10 @@ class PaintApp:
         self.shapes: list[dict[str, object]] = []
         self.erase_strokes: list[dict[str, object]] = []
 
+        # Shape part bounding boxes for hit tests; keys are shape ids.
+        self.shape_grid = ShapeGrid()
+        self.next_shape_id = 0
+
         # Temporary state while drawing.
         self.is_drawing = False
         self.start_pos: tuple[int, int] | None = None
@@ -52,6 +103,15 @@ class PaintApp:
         self.eraser_cursor, self.eraser_hotspot = self.create_eraser_cursor_icon()
         pygame.mouse.set_visible(False)
 
+        # Only changed screen rects are redrawn and sent to the display.
+        # The toolbar is kept on its own surface (its bottom line overlaps
+        # the canvas by 2 pixels) and redrawn only when its state changes.
+        self.dirty_rects: list[pygame.Rect] = [self.screen.get_rect()]
+        self.toolbar_surface = pygame.Surface((WINDOW_WIDTH, TOOLBAR_HEIGHT + 2), pygame.SRCALPHA)
+        self.toolbar_state: tuple[object, ...] | None = None
+        self.last_overlay_rects: list[pygame.Rect] = []
+        self.preview_area: pygame.Rect | None = None
+
     def build_toolbar(self) -> None:
         # Tool button layout
         tool_names = ["pen", "rectangle", "circle", "eraser"]
@@ -151,6 +211,7 @@ class PaintApp:
 
     def rebuild_canvas(self) -> None:
         self.canvas.fill((255, 255, 255))
+        self.dirty_rects.append(self.canvas.get_rect().move(0, TOOLBAR_HEIGHT))
         for shape in self.shapes:
             self.draw_shape(self.canvas, shape)
         for erase_stroke in self.erase_strokes:
@@ -182,7 +243,12 @@ class PaintApp:
         closest_y = ay + t * aby
         return ((px - closest_x) ** 2 + (py - closest_y) ** 2) ** 0.5
 
-    def point_hits_shape(self, point: tuple[int, int], shape: dict[str, object]) -> bool:
+    def point_hits_shape(
+        self,
+        point: tuple[int, int],
+        shape: dict[str, object],
+        segments: list[int] | None = None,
+    ) -> bool:
         shape_type = str(shape["type"])
 
         if shape_type == "stroke":
@@ -195,7 +261,8 @@ class PaintApp:
                 dy = point[1] - points[0][1]
                 return (dx * dx + dy * dy) <= threshold * threshold
 
-            for index in range(len(points) - 1):
+            # Only the segments the shape grid found near the point, if given.
+            for index in range(len(points) - 1) if segments is None else segments:
                 dist = self.point_to_segment_distance(point, points[index], points[index + 1])
                 if dist <= threshold:
                     return True
@@ -207,19 +274,56 @@ class PaintApp:
 
         return False
 
-    def get_shape_index_at_point(self, point: tuple[int, int]) -> int:
-        # Remove top-most shape first (last drawn = highest index).
-        for index in range(len(self.shapes) - 1, -1, -1):
-            if self.point_hits_shape(point, self.shapes[index]):
-                return index
-        return -1
+    def points_bounding_rect(self, points: list[tuple[int, int]]) -> pygame.Rect:
+        min_x = min(point[0] for point in points)
+        min_y = min(point[1] for point in points)
+        max_x = max(point[0] for point in points)
+        max_y = max(point[1] for point in points)
+        return pygame.Rect(min_x, min_y, max_x - min_x, max_y - min_y)
+
+    def get_hit_boxes(self, shape: dict[str, object]) -> list[tuple[int, pygame.Rect]]:
+        """Return (part, rect) boxes covering every point that hits the shape.
+
+        Stroke parts are segment indexes; other shapes have a single part 0.
+        """
+        shape_type = str(shape["type"])
+
+        if shape_type == "stroke":
+            points = list(shape["points"])  # type: ignore[arg-type]
+            pad = 2 * max(6, int(shape["width"]) + 3) + 2
+            if len(points) == 1:
+                return [(0, self.points_bounding_rect(points).inflate(pad, pad))]
+            return [
+                (index, self.points_bounding_rect(points[index:index + 2]).inflate(pad, pad))
+                for index in range(len(points) - 1)
+            ]
+
+        rect = pygame.Rect(shape["rect"])  # type: ignore[arg-type]
+        return [(0, rect.inflate(8, 8))]
+
+    def add_shape(self, shape: dict[str, object]) -> None:
+        shape["id"] = self.next_shape_id
+        self.next_shape_id += 1
+        self.shapes.append(shape)
+        self.shape_grid.add(int(shape["id"]), shape, self.get_hit_boxes(shape))
+
+    def get_shape_at_point(self, point: tuple[int, int]) -> dict[str, object] | None:
+        """Return the top-most shape under the point, checking only nearby shapes."""
+        nearby = self.shape_grid.near(point)
+        # Newest (highest id) first, like the drawing order.
+        for shape_id in sorted(nearby, reverse=True):
+            shape = self.shape_grid.items[shape_id]
+            if self.point_hits_shape(point, shape, nearby[shape_id]):
+                return shape
+        return None
 
     def delete_shape_at_point(self, point: tuple[int, int]) -> bool:
-        index = self.get_shape_index_at_point(point)
-        if index == -1:
+        shape = self.get_shape_at_point(point)
+        if shape is None:
             return False
 
-        del self.shapes[index]
+        self.shape_grid.remove(int(shape["id"]))
+        self.shapes = [item for item in self.shapes if item is not shape]
         self.rebuild_canvas()
         return True
 
@@ -282,7 +386,7 @@ class PaintApp:
         if self.start_pos is not None and end_pos is not None:
             if self.current_tool == "pen":
                 if self.active_stroke_points:
-                    self.shapes.append(
+                    self.add_shape(
                         {
                             "type": "stroke",
                             "points": list(self.active_stroke_points),
@@ -308,7 +412,7 @@ class PaintApp:
             elif self.current_tool == "rectangle":
                 rect = self.get_drag_rect(self.start_pos, end_pos)
                 if rect.width > 0 and rect.height > 0:
-                    self.shapes.append(
+                    self.add_shape(
                         {
                             "type": "rectangle",
                             "rect": rect,
@@ -321,7 +425,7 @@ class PaintApp:
             elif self.current_tool == "circle":
                 rect = self.get_drag_rect(self.start_pos, end_pos)
                 if rect.width > 0 and rect.height > 0:
-                    self.shapes.append(
+                    self.add_shape(
                         {
                             "type": "circle",
                             "rect": rect,
@@ -337,8 +441,9 @@ class PaintApp:
         self.active_stroke_points = []
 
     def draw_toolbar(self) -> None:
-        pygame.draw.rect(self.screen, (230, 230, 235), (0, 0, WINDOW_WIDTH, TOOLBAR_HEIGHT))
-        pygame.draw.line(self.screen, (170, 170, 180), (0, TOOLBAR_HEIGHT), (WINDOW_WIDTH, TOOLBAR_HEIGHT), 2)
+        self.toolbar_surface.fill((0, 0, 0, 0))
+        pygame.draw.rect(self.toolbar_surface, (230, 230, 235), (0, 0, WINDOW_WIDTH, TOOLBAR_HEIGHT))
+        pygame.draw.line(self.toolbar_surface, (170, 170, 180), (0, TOOLBAR_HEIGHT), (WINDOW_WIDTH, TOOLBAR_HEIGHT), 2)
 
         # Draw tool buttons.
         for tool_name, rect in self.tools:
@@ -346,26 +451,26 @@ class PaintApp:
                 color = (85, 145, 255)
             else:
                 color = (205, 210, 220)
-            pygame.draw.rect(self.screen, color, rect, border_radius=8)
-            pygame.draw.rect(self.screen, (100, 100, 110), rect, width=2, border_radius=8)
+            pygame.draw.rect(self.toolbar_surface, color, rect, border_radius=8)
+            pygame.draw.rect(self.toolbar_surface, (100, 100, 110), rect, width=2, border_radius=8)
 
             label = self.font.render(tool_name.upper(), True, (20, 20, 25))
             label_rect = label.get_rect(center=rect.center)
-            self.screen.blit(label, label_rect)
+            self.toolbar_surface.blit(label, label_rect)
 
         # Draw color buttons.
         for color, rect in self.colors:
-            pygame.draw.rect(self.screen, color, rect, border_radius=5)
+            pygame.draw.rect(self.toolbar_surface, color, rect, border_radius=5)
             border_color = (0, 0, 0) if color == self.current_color else (95, 95, 105)
             border_width = 3 if color == self.current_color else 1
-            pygame.draw.rect(self.screen, border_color, rect, width=border_width, border_radius=5)
+            pygame.draw.rect(self.toolbar_surface, border_color, rect, width=border_width, border_radius=5)
 
         info_text = self.font.render(
             "Left drag with eraser = manual erase | Right click = delete whole shape",
             True,
             (32, 32, 42),
         )
-        self.screen.blit(info_text, (390, 74))
+        self.toolbar_surface.blit(info_text, (390, 74))
 
     def draw_preview_shape(self) -> None:
         # Show live preview while dragging.
@@ -422,17 +527,16 @@ class PaintApp:
             elif self.current_tool == "circle":
                 pygame.draw.ellipse(self.screen, self.current_color, screen_preview_rect, width=2)
 
-    def draw_delete_highlight(self) -> None:
+    def get_delete_highlight_rect(self) -> pygame.Rect | None:
         mouse_pos = pygame.mouse.get_pos()
         canvas_pos = self.get_canvas_pos(mouse_pos)
         if canvas_pos is None:
-            return
+            return None
 
-        index = self.get_shape_index_at_point(canvas_pos)
-        if index == -1:
-            return
+        shape = self.get_shape_at_point(canvas_pos)
+        if shape is None:
+            return None
 
-        shape = self.shapes[index]
         shape_type = str(shape["type"])
 
         if shape_type in {"rectangle", "circle"}:
@@ -447,7 +551,12 @@ class PaintApp:
             highlight_rect = pygame.Rect(min_x, min_y, max_x - min_x, max_y - min_y).inflate(16, 16)
             highlight_rect.y += TOOLBAR_HEIGHT
 
-        pygame.draw.rect(self.screen, (255, 80, 80), highlight_rect, width=2, border_radius=5)
+        return highlight_rect
+
+    def draw_delete_highlight(self) -> None:
+        highlight_rect = self.get_delete_highlight_rect()
+        if highlight_rect is not None:
+            pygame.draw.rect(self.screen, (255, 80, 80), highlight_rect, width=2, border_radius=5)
 
     def draw_custom_cursor(self) -> None:
         mouse_x, mouse_y = pygame.mouse.get_pos()
@@ -467,22 +576,85 @@ class PaintApp:
         pygame.draw.line(self.screen, (35, 35, 35), (mouse_x - 8, mouse_y), (mouse_x + 8, mouse_y), 1)
         pygame.draw.line(self.screen, (35, 35, 35), (mouse_x, mouse_y - 8), (mouse_x, mouse_y + 8), 1)
 
-    def draw(self) -> None:
-        self.screen.fill((240, 240, 244))
-        self.screen.blit(self.canvas, (0, TOOLBAR_HEIGHT))
-        self.draw_toolbar()
+    def get_preview_rect(self) -> pygame.Rect | None:
+        """Return the screen area the drag preview covers this frame."""
+        if not self.is_drawing or self.start_pos is None or self.current_pos is None:
+            return None
+
+        if self.current_tool in {"pen", "eraser"}:
+            if not self.active_stroke_points:
+                return None
+            # Only the newest segment and the joint before it change; the
+            # rest of the stroke is on screen from earlier frames.
+            width = self.eraser_size if self.current_tool == "eraser" else self.pen_size
+            rect = self.points_bounding_rect(self.active_stroke_points[-3:])
+        else:
+            width = 2
+            rect = self.points_bounding_rect([self.start_pos, self.current_pos])
+        pad = 2 * width + 4
+        return rect.inflate(pad, pad).move(0, TOOLBAR_HEIGHT)
+
+    def get_cursor_rect(self) -> pygame.Rect:
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        return pygame.Rect(mouse_x - 26, mouse_y - 26, 52, 52)
+
+    def draw(self) -> list[pygame.Rect]:
+        """Redraw the changed parts of the window and return their rects."""
+        toolbar_state = (self.current_tool, self.current_color)
+        if toolbar_state != self.toolbar_state:
+            self.toolbar_state = toolbar_state
+            self.draw_toolbar()
+            self.dirty_rects.append(self.toolbar_surface.get_rect())
+
+        # Overlays are erased where they were last frame and drawn where they are now.
+        preview_rect = self.get_preview_rect()
+        overlays = [
+            rect
+            for rect in (self.get_cursor_rect(), preview_rect, self.get_delete_highlight_rect())
+            if rect is not None
+        ]
+        rects = self.dirty_rects + self.last_overlay_rects + overlays
+        self.dirty_rects = []
+        self.last_overlay_rects = overlays
+
+        # A stroke preview is redrawn only around its newest segment, so
+        # everything it covered is redrawn once the preview goes away.
+        if preview_rect is not None:
+            self.preview_area = preview_rect.union(self.preview_area or preview_rect)
+        elif self.preview_area is not None:
+            rects.append(self.preview_area)
+            self.preview_area = None
+
+        for rect in rects:
+            self.screen.set_clip(rect)
+            self.screen.blit(self.canvas, (0, TOOLBAR_HEIGHT))
+            self.screen.blit(self.toolbar_surface, (0, 0))
+        self.screen.set_clip(None)
+
+        # Overlays are drawn unclipped (pygame rasterizes clipped thick lines
+        # slightly differently); they lie inside rects anyway.
         self.draw_preview_shape()
         self.draw_delete_highlight()
         self.draw_custom_cursor()
+        return rects
 
     def run(self) -> None:
         running = True
 
         while running:
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            if not events and not self.dirty_rects:
+                # Nothing changes until the next event, so wait for one
+                # instead of redrawing every frame.
+                events = [pygame.event.wait()]
+
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
 
+                elif event.type == pygame.VIDEOEXPOSE:
+                    self.dirty_rects.append(self.screen.get_rect())
+
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
                         running = False
@@ -499,8 +671,7 @@ class PaintApp:
                 elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                     self.handle_left_mouse_up(event.pos)
 
-            self.draw()
-            pygame.display.flip()
+            pygame.display.update(self.draw())
             self.clock.tick(60)
 
         pygame.mouse.set_visible(True)
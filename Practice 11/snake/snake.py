@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import random
+from collections import deque
 
 import pygame
 
@@ -29,6 +30,40 @@ def is_opposite_direction(a: tuple[int, int], b: tuple[int, int]) -> bool:
     return a[0] == -b[0] and a[1] == -b[1]
 
 
+class FreeCells:
+    """Interior cells the snake does not cover, kept up to date move by move.
+
+    A list plus a cell -> list index map: remove swaps the last cell into the
+    hole, so add, remove and a random pick are O(1) instead of a grid scan.
+    """
+
+    def __init__(self, occupied: set[tuple[int, int]]):
+        self.cells = [
+            (x, y)
+            for x in range(1, GRID_COLS - 1)
+            for y in range(1, GRID_ROWS - 1)
+            if (x, y) not in occupied
+        ]
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+
+    def add(self, cell: tuple[int, int]) -> None:
+        if cell not in self.index and not is_wall(cell):
+            self.index[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def remove(self, cell: tuple[int, int]) -> None:
+        i = self.index.pop(cell, None)
+        if i is None:
+            return
+        last = self.cells.pop()
+        if i < len(self.cells):
+            self.cells[i] = last
+            self.index[last] = i
+
+    def choice(self) -> tuple[int, int] | None:
+        return random.choice(self.cells) if self.cells else None
+
+
 class SnakeGame:
     """Practice 11 Snake: weighted food + disappearing timer."""
 
@@ -37,6 +72,7 @@ class SnakeGame:
         pygame.display.set_caption("Practice 11 - Snake")
 
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.field_layer: pygame.Surface | None = None
         self.clock = pygame.time.Clock()
 
         self.title_font = pygame.font.SysFont("arial", 32, bold=True)
@@ -50,7 +86,11 @@ class SnakeGame:
         # Snake starts with 3 body parts in center.
         start_x = GRID_COLS // 2
         start_y = GRID_ROWS // 2
-        self.snake = [(start_x, start_y), (start_x - 1, start_y), (start_x - 2, start_y)]
+        self.snake = deque([(start_x, start_y), (start_x - 1, start_y), (start_x - 2, start_y)])
+        # Same cells as a set, so "is this cell the snake?" is O(1) for any length.
+        self.snake_cells = set(self.snake)
+        # Everything else inside the walls; food spawns from here.
+        self.free_cells = FreeCells(self.snake_cells)
 
         self.direction = (1, 0)
         self.next_direction = (1, 0)
@@ -64,18 +104,11 @@ class SnakeGame:
 
     def generate_food_position(self) -> tuple[int, int]:
         """Food cannot spawn on wall border or on snake body."""
-        snake_cells = set(self.snake)
-        free_cells: list[tuple[int, int]] = []
-
-        for x in range(1, GRID_COLS - 1):
-            for y in range(1, GRID_ROWS - 1):
-                cell = (x, y)
-                if cell not in snake_cells:
-                    free_cells.append(cell)
-
-        if not free_cells:
+        cell = self.free_cells.choice()
+        if cell is None:
+            # This case is very rare (board completely filled).
             return (1, 1)
-        return random.choice(free_cells)
+        return cell
 
     def generate_food(self) -> dict[str, object]:
         """Create weighted food with random color/value and start timer."""
@@ -151,11 +184,13 @@ class SnakeGame:
             self.game_over = True
             return
 
-        if new_head in self.snake:
+        if new_head in self.snake_cells:
             self.game_over = True
             return
 
-        self.snake.insert(0, new_head)
+        self.snake.appendleft(new_head)
+        self.snake_cells.add(new_head)
+        self.free_cells.remove(new_head)
 
         food_pos = tuple(self.food["pos"])  # type: ignore[arg-type]
         food_weight = int(self.food["weight"])
@@ -165,22 +200,27 @@ class SnakeGame:
             self.update_level_and_speed()
             self.food = self.generate_food()
         else:
-            self.snake.pop()
+            tail = self.snake.pop()
+            self.snake_cells.discard(tail)
+            self.free_cells.add(tail)
 
-    def draw_grid(self) -> None:
-        play_area = pygame.Rect(0, HUD_HEIGHT, WINDOW_WIDTH, WINDOW_HEIGHT - HUD_HEIGHT)
-        pygame.draw.rect(self.screen, (18, 18, 20), play_area)
+    def build_field_layer(self) -> pygame.Surface:
+        """Render the board background and walls once; they never change."""
+        layer = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT - HUD_HEIGHT)).convert()
+        layer.fill((18, 18, 20))
 
         for x in range(GRID_COLS):
             for y in range(GRID_ROWS):
                 if is_wall((x, y)):
-                    cell_rect = pygame.Rect(
-                        x * CELL_SIZE,
-                        HUD_HEIGHT + y * CELL_SIZE,
-                        CELL_SIZE,
-                        CELL_SIZE,
-                    )
-                    pygame.draw.rect(self.screen, (80, 80, 90), cell_rect)
+                    cell_rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+                    pygame.draw.rect(layer, (80, 80, 90), cell_rect)
+        return layer
+
+    def draw_grid(self) -> None:
+        # One blit per frame instead of a draw call for every wall cell.
+        if self.field_layer is None:
+            self.field_layer = self.build_field_layer()
+        self.screen.blit(self.field_layer, (0, HUD_HEIGHT))
 
     def draw_food(self) -> None:
         fx, fy = tuple(self.food["pos"])  # type: ignore[arg-type]
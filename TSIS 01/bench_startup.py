@@ -0,0 +1,85 @@
+﻿"""Cold-start benchmark for the TSIS 01 PhoneBook CLI.
+
+Every scenario runs in a fresh interpreter, so the numbers include Python
+startup, imports, DB connection and the command itself. One extra run with
+`-X importtime` shows which top-level imports cost the most.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parent / "phonebook.py"
+
+# name -> (CLI arguments, text sent to stdin)
+SCENARIOS = {
+    "help": (["--help"], ""),
+    "search": (["search", "--query", "a"], ""),
+    "page": (["page", "--limit", "5"], "quit\n"),
+}
+
+
+def run_once(args: list[str], stdin_text: str, importtime: bool = False) -> tuple[float, str]:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [str(SCRIPT), *args]
+
+    start = time.perf_counter()
+    completed = subprocess.run(command, input=stdin_text, capture_output=True, text=True)
+    return time.perf_counter() - start, completed.stderr
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for top-level imports only."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two extra spaces per level.
+        if name.startswith("  "):
+            continue
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def print_import_summary(stderr: str, top: int) -> None:
+    rows = parse_importtime(stderr)
+    total_ms = sum(row[2] for row in rows) / 1000
+    print(f"  imports: {len(rows)} top-level, {total_ms:.1f} ms cumulative")
+    for name, _, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:top]:
+        print(f"    {cumulative_us / 1000:7.2f} ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TSIS 01 PhoneBook cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=10, help="Runs per scenario.")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to show.")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=list(SCENARIOS),
+        help="Scenario to run, can be repeated (default: all).",
+    )
+    args = parser.parse_args()
+
+    for name in args.scenario or list(SCENARIOS):
+        cli_args, stdin_text = SCENARIOS[name]
+        timings = [run_once(cli_args, stdin_text)[0] * 1000 for _ in range(args.runs)]
+        print(
+            f"{name}: min {min(timings):.1f} ms, "
+            f"median {statistics.median(timings):.1f} ms over {args.runs} runs"
+        )
+        _, stderr = run_once(cli_args, stdin_text, importtime=True)
+        print_import_summary(stderr, args.top)
+
+
+if __name__ == "__main__":
+    main()
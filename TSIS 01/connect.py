@@ -2,17 +2,22 @@
 
 from __future__ import annotations
 
-from pathlib import Path
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+
+from config import load_config
+
+# The driver is imported on first connection, not at module load (keeps
+# `phonebook.py --help` fast). Same trick as typing.TYPE_CHECKING.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
 
-try:
-    import psycopg as pg_driver
     from psycopg import Connection
-except ModuleNotFoundError as exc:
-    raise SystemExit(
-        "PostgreSQL driver not found. Install: pip install psycopg[binary]"
-    ) from exc
 
-from config import load_config
+# Bump when any SQL below, functions.sql or procedures.sql changes,
+# so ensure_db() reinstalls the schema on the next run.
+SCHEMA_VERSION = 1
 
 CREATE_BASE_CONTACTS_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS contacts (
@@ -120,6 +125,38 @@ CREATE INDEX IF NOT EXISTS idx_phones_contact_id
 ON phones (contact_id);
 """
 
+CREATE_IMPORT_RUNS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS import_runs (
+    id SERIAL PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    file_kind VARCHAR(10) NOT NULL CHECK (file_kind IN ('json', 'csv')),
+    content_hash CHAR(64) NOT NULL,
+    batch_size INTEGER NOT NULL,
+    items_done BIGINT NOT NULL DEFAULT 0,
+    byte_offset BIGINT NOT NULL DEFAULT 0,
+    stats JSONB NOT NULL DEFAULT '{}'::JSONB,
+    status VARCHAR(10) NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'done')),
+    started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_runs_lookup
+ON import_runs (file_kind, content_hash, status);
+"""
+
+CREATE_SCHEMA_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version INTEGER NOT NULL
+);
+"""
+
+SAVE_SCHEMA_VERSION_SQL = """
+INSERT INTO schema_version(id, version)
+VALUES (TRUE, %s)
+ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version;
+"""
+
 MIGRATE_OLD_PHONE_TO_PHONES_SQL = """
 INSERT INTO phones (contact_id, phone, type)
 SELECT c.id, c.phone, 'mobile'
@@ -130,11 +167,54 @@ ON CONFLICT (contact_id, phone) DO NOTHING;
 """
 
 
-def get_connection() -> Connection:
-    """Create and return a PostgreSQL connection."""
+_shared_connection: Connection | None = None
+
+
+def _connect() -> Connection:
+    try:
+        import psycopg as pg_driver
+    except ModuleNotFoundError as exc:
+        raise SystemExit(
+            "PostgreSQL driver not found. Install: pip install psycopg[binary]"
+        ) from exc
+
     return pg_driver.connect(**load_config())
 
 
+def get_connection() -> Connection | AbstractContextManager[Connection]:
+    """Create and return a PostgreSQL connection.
+
+    Inside `shared_connection()` the open shared connection is handed out instead,
+    wrapped so that `with get_connection()` does not commit or close it.
+    """
+    if _shared_connection is not None:
+        return nullcontext(_shared_connection)
+    return _connect()
+
+
+@contextmanager
+def shared_connection() -> Iterator[Connection]:
+    """Reuse one connection for every get_connection() call inside the block.
+
+    The work is committed when the block ends without an error. Nested calls
+    reuse the outer connection and leave committing to the outer block.
+    """
+    global _shared_connection
+
+    if _shared_connection is not None:
+        yield _shared_connection
+        return
+
+    conn = _connect()
+    _shared_connection = conn
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        _shared_connection = None
+        conn.close()
+
+
 def _execute_sql_file(cur: object, file_path: Path) -> None:
     sql = file_path.read_text(encoding="utf-8").strip()
     if sql:
@@ -143,6 +223,8 @@ def _execute_sql_file(cur: object, file_path: Path) -> None:
 
 def init_db() -> None:
     """Create/extend schema and install SQL functions/procedures."""
+    from pathlib import Path
+
     base_dir = Path(__file__).resolve().parent
     functions_sql = base_dir / "functions.sql"
     procedures_sql = base_dir / "procedures.sql"
@@ -156,6 +238,24 @@ def init_db() -> None:
             cur.execute(CREATE_CONTACTS_FOREIGN_KEY_SQL)
             cur.execute(CREATE_PHONES_TABLE_SQL)
             cur.execute(CREATE_INDEXES_SQL)
+            cur.execute(CREATE_IMPORT_RUNS_TABLE_SQL)
             cur.execute(MIGRATE_OLD_PHONE_TO_PHONES_SQL)
             _execute_sql_file(cur, functions_sql)
             _execute_sql_file(cur, procedures_sql)
+            cur.execute(CREATE_SCHEMA_VERSION_SQL)
+            cur.execute(SAVE_SCHEMA_VERSION_SQL, (SCHEMA_VERSION,))
+
+
+def ensure_db() -> None:
+    """Run init_db() only when the schema is missing or older than SCHEMA_VERSION."""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT TO_REGCLASS('schema_version') IS NOT NULL;")
+            version = None
+            if cur.fetchone()[0]:
+                cur.execute("SELECT version FROM schema_version;")
+                row = cur.fetchone()
+                version = row[0] if row else None
+
+    if version != SCHEMA_VERSION:
+        init_db()
@@ -0,0 +1,301 @@
+﻿"""Duplicate contact detection and bulk merge for TSIS 01 Extended PhoneBook.
+
+Candidates are found with blocking keys (normalized phone, email, name trigram)
+so only contacts sharing a key are compared, instead of all n * n pairs.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import defaultdict
+from itertools import combinations
+from typing import Any
+
+from connect import get_connection
+
+DEFAULT_THRESHOLD = 0.6
+DEFAULT_BATCH_SIZE = 100
+# Blocks bigger than this (e.g. a very common trigram) are not discriminating
+# and would bring back the quadratic comparison, so they are ignored.
+MAX_BLOCK_SIZE = 50
+
+NAME_WEIGHT = 0.6
+PHONE_WEIGHT = 0.25
+EMAIL_WEIGHT = 0.15
+
+TRANSLIT_MAP = {
+    "а": "a", "ә": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d",
+    "е": "e", "ё": "e", "ж": "zh", "з": "z", "и": "i", "й": "i", "к": "k",
+    "қ": "k", "л": "l", "м": "m", "н": "n", "ң": "n", "о": "o", "ө": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ұ": "u", "ү": "u",
+    "ф": "f", "х": "kh", "һ": "h", "ц": "ts", "ч": "ch", "ш": "sh",
+    "щ": "sch", "ъ": "", "ы": "y", "і": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+
+LOAD_CONTACTS_SQL = """
+    SELECT
+        c.id,
+        c.first_name,
+        c.surname,
+        COALESCE(c.email, '') AS email,
+        c.birthday,
+        COALESCE(g.name, 'Other') AS group_name,
+        c.group_id,
+        COALESCE(ARRAY_AGG(p.phone ORDER BY p.id) FILTER (WHERE p.phone IS NOT NULL), '{}') AS phones
+    FROM contacts AS c
+    LEFT JOIN groups AS g ON g.id = c.group_id
+    LEFT JOIN phones AS p ON p.contact_id = c.id
+    GROUP BY c.id, c.first_name, c.surname, c.email, c.birthday, g.name, c.group_id
+    ORDER BY c.id;
+"""
+
+
+def transliterate(value: str) -> str:
+    text = "".join(TRANSLIT_MAP.get(ch, ch) for ch in value.lower())
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def normalize_full_name(first_name: str, surname: str) -> str:
+    text = transliterate(f"{first_name} {surname}")
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return " ".join(text.split())
+
+
+def normalize_phone_digits(phone: str) -> str:
+    digits = re.sub(r"\D", "", phone)
+    # +7 701 ... and 8 701 ... are the same number, so compare the national part.
+    return digits[-10:]
+
+
+def name_trigrams(name: str) -> set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def trigram_similarity(left: set[str], right: set[str]) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def build_profile(row: Any) -> dict[str, Any]:
+    name = normalize_full_name(row[1], row[2])
+    phones = [str(phone) for phone in row[7]]
+    return {
+        "id": int(row[0]),
+        "first_name": row[1],
+        "surname": row[2],
+        "email": row[3] or "",
+        "birthday": row[4],
+        "group": row[5] or "Other",
+        "group_id": row[6],
+        "phones": phones,
+        "name_key": name,
+        "trigrams": name_trigrams(name),
+        "phone_keys": {key for key in (normalize_phone_digits(p) for p in phones) if len(key) >= 4},
+        "email_key": (row[3] or "").strip().lower(),
+    }
+
+
+def load_contact_profiles() -> list[dict[str, Any]]:
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(LOAD_CONTACTS_SQL)
+            rows = cur.fetchall()
+    return [build_profile(row) for row in rows]
+
+
+def build_blocks(profiles: list[dict[str, Any]]) -> dict[str, list[int]]:
+    blocks: dict[str, list[int]] = defaultdict(list)
+    for index, profile in enumerate(profiles):
+        for phone_key in profile["phone_keys"]:
+            blocks[f"phone:{phone_key}"].append(index)
+        if profile["name_key"]:
+            blocks[f"full:{profile['name_key']}"].append(index)
+        if profile["email_key"]:
+            blocks[f"email:{profile['email_key']}"].append(index)
+        for trigram in profile["trigrams"]:
+            blocks[f"name:{trigram}"].append(index)
+    return blocks
+
+
+def score_pair(left: dict[str, Any], right: dict[str, Any]) -> float:
+    if left["name_key"] and left["name_key"] == right["name_key"]:
+        name_score = 1.0
+    else:
+        name_score = trigram_similarity(left["trigrams"], right["trigrams"])
+
+    score = NAME_WEIGHT * name_score
+    if left["phone_keys"] & right["phone_keys"]:
+        score += PHONE_WEIGHT
+    if left["email_key"] and left["email_key"] == right["email_key"]:
+        score += EMAIL_WEIGHT
+    return round(score, 3)
+
+
+def _find_root(parents: list[int], index: int) -> int:
+    while parents[index] != index:
+        parents[index] = parents[parents[index]]
+        index = parents[index]
+    return index
+
+
+def richness(profile: dict[str, Any]) -> tuple[int, int]:
+    filled = sum(
+        [
+            bool(profile["email"]),
+            profile["birthday"] is not None,
+            profile["group"] != "Other",
+            bool(profile["surname"]),
+        ]
+    )
+    return filled + len(profile["phones"]), -profile["id"]
+
+
+def find_duplicate_clusters(
+    profiles: list[dict[str, Any]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> list[dict[str, Any]]:
+    """Return clusters of likely duplicates, richest contact first in each cluster."""
+    candidate_pairs: set[tuple[int, int]] = set()
+    for members in build_blocks(profiles).values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        candidate_pairs.update(combinations(sorted(set(members)), 2))
+
+    parents = list(range(len(profiles)))
+    best_scores: dict[int, float] = {}
+
+    for left, right in candidate_pairs:
+        score = score_pair(profiles[left], profiles[right])
+        if score < threshold:
+            continue
+        left_root = _find_root(parents, left)
+        right_root = _find_root(parents, right)
+        parents[right_root] = left_root
+        best_scores[left] = max(best_scores.get(left, 0.0), score)
+        best_scores[right] = max(best_scores.get(right, 0.0), score)
+
+    grouped: dict[int, list[int]] = defaultdict(list)
+    for index in best_scores:
+        grouped[_find_root(parents, index)].append(index)
+
+    clusters = []
+    for indexes in grouped.values():
+        members = sorted((profiles[index] for index in indexes), key=richness, reverse=True)
+        clusters.append(
+            {
+                "survivor": members[0],
+                "duplicates": members[1:],
+                "score": max(best_scores[index] for index in indexes),
+            }
+        )
+    clusters.sort(key=lambda cluster: cluster["survivor"]["id"])
+    return clusters
+
+
+def merged_fields(cluster: dict[str, Any]) -> dict[str, Any]:
+    """Keep the survivor's values and fill its empty fields from the duplicates."""
+    survivor = cluster["survivor"]
+    fields = {
+        "email": survivor["email"] or None,
+        "birthday": survivor["birthday"],
+        "group_id": survivor["group_id"],
+    }
+    group_is_default = survivor["group"] == "Other"
+
+    for duplicate in cluster["duplicates"]:
+        if fields["email"] is None and duplicate["email"]:
+            fields["email"] = duplicate["email"]
+        if fields["birthday"] is None and duplicate["birthday"] is not None:
+            fields["birthday"] = duplicate["birthday"]
+        if group_is_default and duplicate["group"] != "Other":
+            fields["group_id"] = duplicate["group_id"]
+            group_is_default = False
+    return fields
+
+
+def merge_cluster(cur: Any, cluster: dict[str, Any]) -> None:
+    survivor_id = cluster["survivor"]["id"]
+    duplicate_ids = [duplicate["id"] for duplicate in cluster["duplicates"]]
+    fields = merged_fields(cluster)
+
+    cur.execute(
+        """
+        UPDATE contacts
+        SET email = %s,
+            birthday = %s,
+            group_id = %s
+        WHERE id = %s;
+        """,
+        (fields["email"], fields["birthday"], fields["group_id"], survivor_id),
+    )
+    cur.execute(
+        """
+        INSERT INTO phones(contact_id, phone, type)
+        SELECT %s, p.phone, p.type
+        FROM phones AS p
+        WHERE p.contact_id = ANY(%s::INT[])
+        ORDER BY p.id
+        ON CONFLICT (contact_id, phone) DO NOTHING;
+        """,
+        (survivor_id, duplicate_ids),
+    )
+    cur.execute("DELETE FROM contacts WHERE id = ANY(%s::INT[]);", (duplicate_ids,))
+
+
+def merge_duplicate_clusters(
+    clusters: list[dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Merge clusters into their survivors, one transaction per batch of clusters."""
+    if batch_size <= 0:
+        raise ValueError("Batch size must be greater than 0")
+
+    merged = 0
+    with get_connection() as conn:
+        for start in range(0, len(clusters), batch_size):
+            batch = clusters[start:start + batch_size]
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    for cluster in batch:
+                        merge_cluster(cur, cluster)
+            merged += sum(len(cluster["duplicates"]) for cluster in batch)
+    return merged
+
+
+def format_profile(profile: dict[str, Any]) -> str:
+    full_name = f"{profile['first_name']} {profile['surname']}".strip()
+    phones = ", ".join(profile["phones"]) or "-"
+    email = profile["email"] or "-"
+    return f"#{profile['id']} {full_name} | email: {email} | phones: {phones}"
+
+
+def print_duplicate_report(clusters: list[dict[str, Any]]) -> None:
+    if not clusters:
+        print("No duplicate contacts found.")
+        return
+
+    print(f"\nDuplicate clusters: {len(clusters)}")
+    for index, cluster in enumerate(clusters, start=1):
+        print(f"{index}. score={cluster['score']:.2f}")
+        print(f"   keep  {format_profile(cluster['survivor'])}")
+        for duplicate in cluster["duplicates"]:
+            print(f"   merge {format_profile(duplicate)}")
+
+
+def dedupe_contacts(
+    threshold: float = DEFAULT_THRESHOLD,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict[str, int]:
+    clusters = find_duplicate_clusters(load_contact_profiles(), threshold)
+    print_duplicate_report(clusters)
+
+    stats = {"clusters": len(clusters), "merged": 0}
+    if not dry_run and clusters:
+        stats["merged"] = merge_duplicate_clusters(clusters, batch_size)
+    return stats
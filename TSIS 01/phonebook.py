@@ -2,20 +2,27 @@
 
 from __future__ import annotations
 
+# Only modules needed to parse arguments are imported here. csv, json, datetime,
+# pathlib, the PostgreSQL driver, etc. are imported inside the commands that use
+# them, so `--help` and simple commands start fast (see bench_startup.py).
 import argparse
-import csv
-import json
+import os
 import re
 import sys
-from datetime import date, datetime
-from pathlib import Path
-from typing import Any
 
-CURRENT_DIR = Path(__file__).resolve().parent
-if str(CURRENT_DIR) not in sys.path:
-    sys.path.insert(0, str(CURRENT_DIR))
+# Same idea as typing.TYPE_CHECKING without importing typing at runtime.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from datetime import date
+    from pathlib import Path
+    from typing import Any
 
-from connect import get_connection, init_db
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+if CURRENT_DIR not in sys.path:
+    sys.path.insert(0, CURRENT_DIR)
+
+from connect import ensure_db, get_connection, init_db, shared_connection
 
 PHONE_REGEX = re.compile(r"^\+?[0-9][0-9\-\s]{3,31}$")
 VALID_PHONE_TYPES = {"home", "work", "mobile"}
@@ -24,6 +31,22 @@ SORT_SQL = {
     "birthday": "c.birthday NULLS LAST, LOWER(c.first_name), c.id",
     "date_added": "c.created_at, c.id",
 }
+IMPORT_BATCH_SIZE = 1000
+BATCH_COMMIT_EVERY = 100
+DUPLICATE_ACTIONS = ["ask", "skip", "overwrite"]
+# Same values as dedupe.DEFAULT_THRESHOLD / DEFAULT_BATCH_SIZE; kept here so
+# building the parser does not import the dedupe module.
+DEDUPE_THRESHOLD = 0.6
+DEDUPE_BATCH_SIZE = 100
+# Commands that wait for user input, so they should not hold one open transaction.
+INTERACTIVE_COMMANDS = {None, "menu", "page"}
+# Commands that commit batch by batch on their own; inside shared_connection()
+# their transactions would become savepoints of one run-long transaction.
+OWN_TRANSACTION_COMMANDS = {"dedupe"}
+# Commands that prompt on stdin or manage their own transactions.
+BATCH_UNSUPPORTED_COMMANDS = {"menu", "page", "batch"}
+JSON_READ_CHUNK_SIZE = 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
 
 
 def normalize_name_value(value: str) -> str:
@@ -53,6 +76,8 @@ def parse_iso_birthday(value: str | None) -> date | None:
     if text == "":
         return None
 
+    from datetime import date
+
     try:
         return date.fromisoformat(text)
     except ValueError as exc:
@@ -217,6 +242,8 @@ def print_contacts(rows: list[dict[str, Any]]) -> None:
         print("No contacts found.")
         return
 
+    from datetime import date, datetime
+
     print("\nContacts:")
     for index, row in enumerate(rows, start=1):
         full_name = f"{row['first_name']} {row['surname']}".strip()
@@ -388,6 +415,9 @@ def call_move_to_group(contact_name: str, group_name: str) -> None:
 
 
 def export_contacts_to_json(file_path: Path) -> int:
+    import json
+    from datetime import date, datetime
+
     query = """
         SELECT
             c.id,
@@ -452,7 +482,66 @@ def ask_duplicate_action(full_name: str) -> str:
         print("Please type exactly: skip or overwrite")
 
 
-def import_contacts_from_json(file_path: Path) -> dict[str, int]:
+def import_json_item(
+    cur: Any,
+    item: Any,
+    stats: dict[str, int],
+    on_duplicate: str = "ask",
+) -> None:
+    if not isinstance(item, dict):
+        raise ValueError("Each item must be an object")
+
+    first_name = clean_name_text(str(item.get("first_name", "")))
+    surname = clean_name_text(str(item.get("surname", "")))
+    email = str(item.get("email", "")).strip() or None
+    birthday = parse_iso_birthday(item.get("birthday"))
+    group_name = str(item.get("group", item.get("group_name", "Other"))).strip() or "Other"
+    phones = parse_phones_from_json(item)
+
+    if first_name == "":
+        raise ValueError("first_name is required")
+
+    existing_id = find_contact_id_by_name_pair(cur, first_name, surname)
+    full_name = f"{first_name} {surname}".strip()
+    primary_phone = phones[0][0]
+
+    if existing_id is not None:
+        action = on_duplicate
+        if action == "ask":
+            action = ask_duplicate_action(full_name)
+        if action == "skip":
+            stats["skipped"] += 1
+            return
+
+        update_contact(
+            cur,
+            existing_id,
+            first_name,
+            surname,
+            email,
+            birthday,
+            group_name,
+            primary_phone,
+        )
+        replace_contact_phones(cur, existing_id, phones)
+        stats["updated"] += 1
+    else:
+        new_id = insert_contact(
+            cur,
+            first_name,
+            surname,
+            email,
+            birthday,
+            group_name,
+            primary_phone,
+        )
+        replace_contact_phones(cur, new_id, phones)
+        stats["inserted"] += 1
+
+
+def import_contacts_from_json(file_path: Path, on_duplicate: str = "ask") -> dict[str, int]:
+    import json
+
     data = json.loads(file_path.read_text(encoding="utf-8"))
     if not isinstance(data, list):
         raise ValueError("JSON root must be a list")
@@ -463,54 +552,7 @@ def import_contacts_from_json(file_path: Path) -> dict[str, int]:
         with conn.cursor() as cur:
             for index, item in enumerate(data, start=1):
                 try:
-                    if not isinstance(item, dict):
-                        raise ValueError("Each item must be an object")
-
-                    first_name = clean_name_text(str(item.get("first_name", "")))
-                    surname = clean_name_text(str(item.get("surname", "")))
-                    email = str(item.get("email", "")).strip() or None
-                    birthday = parse_iso_birthday(item.get("birthday"))
-                    group_name = str(item.get("group", item.get("group_name", "Other"))).strip() or "Other"
-                    phones = parse_phones_from_json(item)
-
-                    if first_name == "":
-                        raise ValueError("first_name is required")
-
-                    existing_id = find_contact_id_by_name_pair(cur, first_name, surname)
-                    full_name = f"{first_name} {surname}".strip()
-                    primary_phone = phones[0][0]
-
-                    if existing_id is not None:
-                        action = ask_duplicate_action(full_name)
-                        if action == "skip":
-                            stats["skipped"] += 1
-                            continue
-
-                        update_contact(
-                            cur,
-                            existing_id,
-                            first_name,
-                            surname,
-                            email,
-                            birthday,
-                            group_name,
-                            primary_phone,
-                        )
-                        replace_contact_phones(cur, existing_id, phones)
-                        stats["updated"] += 1
-                    else:
-                        new_id = insert_contact(
-                            cur,
-                            first_name,
-                            surname,
-                            email,
-                            birthday,
-                            group_name,
-                            primary_phone,
-                        )
-                        replace_contact_phones(cur, new_id, phones)
-                        stats["inserted"] += 1
-
+                    import_json_item(cur, item, stats, on_duplicate)
                 except Exception as exc:  # noqa: BLE001 - continue import for students
                     print(f"JSON row {index} skipped: {exc}")
                     stats["invalid"] += 1
@@ -525,7 +567,61 @@ def read_csv_value(row: dict[str, str], names: list[str]) -> str:
     return ""
 
 
+def import_csv_row(cur: Any, row: dict[str, str], stats: dict[str, int]) -> None:
+    first_name = read_csv_value(row, ["first_name", "name", "firstname"])
+    surname = read_csv_value(row, ["surname", "last_name", "lastname"])
+    phone = read_csv_value(row, ["phone", "number", "phone_number"])
+    phone_type = read_csv_value(row, ["phone_type", "type"]) or "mobile"
+    email = read_csv_value(row, ["email"])
+    birthday_raw = read_csv_value(row, ["birthday"])
+    group_name = read_csv_value(row, ["group", "category"]) or "Other"
+
+    first_name = clean_name_text(first_name)
+    surname = clean_name_text(surname)
+
+    if first_name == "":
+        raise ValueError("first_name is required")
+    if phone == "":
+        raise ValueError("phone is required")
+    if not is_valid_phone(phone):
+        raise ValueError(f"invalid phone: {phone}")
+
+    clean_type = normalize_phone_type(phone_type)
+    birthday = parse_iso_birthday(birthday_raw)
+    clean_email = email or None
+
+    existing_id = find_contact_id_by_name_pair(cur, first_name, surname)
+
+    if existing_id is None:
+        new_id = insert_contact(
+            cur,
+            first_name,
+            surname,
+            clean_email,
+            birthday,
+            group_name,
+            phone,
+        )
+        add_or_update_phone(cur, new_id, phone, clean_type)
+        stats["inserted"] += 1
+    else:
+        update_contact(
+            cur,
+            existing_id,
+            first_name,
+            surname,
+            clean_email,
+            birthday,
+            group_name,
+            phone,
+        )
+        add_or_update_phone(cur, existing_id, phone, clean_type)
+        stats["updated"] += 1
+
+
 def import_contacts_from_csv(file_path: Path) -> dict[str, int]:
+    import csv
+
     stats = {"inserted": 0, "updated": 0, "invalid": 0}
 
     with file_path.open("r", encoding="utf-8", newline="") as csv_file:
@@ -537,56 +633,7 @@ def import_contacts_from_csv(file_path: Path) -> dict[str, int]:
             with conn.cursor() as cur:
                 for line_number, row in enumerate(reader, start=2):
                     try:
-                        first_name = read_csv_value(row, ["first_name", "name", "firstname"])
-                        surname = read_csv_value(row, ["surname", "last_name", "lastname"])
-                        phone = read_csv_value(row, ["phone", "number", "phone_number"])
-                        phone_type = read_csv_value(row, ["phone_type", "type"]) or "mobile"
-                        email = read_csv_value(row, ["email"])
-                        birthday_raw = read_csv_value(row, ["birthday"])
-                        group_name = read_csv_value(row, ["group", "category"]) or "Other"
-
-                        first_name = clean_name_text(first_name)
-                        surname = clean_name_text(surname)
-
-                        if first_name == "":
-                            raise ValueError("first_name is required")
-                        if phone == "":
-                            raise ValueError("phone is required")
-                        if not is_valid_phone(phone):
-                            raise ValueError(f"invalid phone: {phone}")
-
-                        clean_type = normalize_phone_type(phone_type)
-                        birthday = parse_iso_birthday(birthday_raw)
-                        clean_email = email or None
-
-                        existing_id = find_contact_id_by_name_pair(cur, first_name, surname)
-
-                        if existing_id is None:
-                            new_id = insert_contact(
-                                cur,
-                                first_name,
-                                surname,
-                                clean_email,
-                                birthday,
-                                group_name,
-                                phone,
-                            )
-                            add_or_update_phone(cur, new_id, phone, clean_type)
-                            stats["inserted"] += 1
-                        else:
-                            update_contact(
-                                cur,
-                                existing_id,
-                                first_name,
-                                surname,
-                                clean_email,
-                                birthday,
-                                group_name,
-                                phone,
-                            )
-                            add_or_update_phone(cur, existing_id, phone, clean_type)
-                            stats["updated"] += 1
-
+                        import_csv_row(cur, row, stats)
                     except Exception as exc:  # noqa: BLE001 - continue importing next row
                         print(f"CSV row {line_number} skipped: {exc}")
                         stats["invalid"] += 1
@@ -594,6 +641,245 @@ def import_contacts_from_csv(file_path: Path) -> dict[str, int]:
     return stats
 
 
+def file_content_hash(file_path: Path) -> str:
+    import hashlib
+
+    digest = hashlib.sha256()
+    with file_path.open("rb") as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_json_array(file_path: Path) -> Iterator[Any]:
+    """Yield items of a top-level JSON list without loading the whole file."""
+    for item, _ in iter_json_array_with_offset(file_path):
+        yield item
+
+
+def iter_json_array_with_offset(
+    file_path: Path,
+    start_offset: int = 0,
+) -> Iterator[tuple[Any, int]]:
+    """Yield (item, byte offset right after the item), starting from a saved offset."""
+    import codecs
+    import json
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+
+    with file_path.open("rb") as json_file:
+
+        def read_chunk() -> tuple[str, bool]:
+            raw = json_file.read(JSON_READ_CHUNK_SIZE)
+            return text_decoder.decode(raw, final=raw == b""), raw == b""
+
+        if start_offset > 0:
+            # Right after an item: only commas, whitespace, items or "]" follow
+            json_file.seek(start_offset)
+            offset = start_offset
+            buffer, eof = read_chunk()
+            position = 0
+        else:
+            offset = 0
+            if json_file.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+                offset = len(codecs.BOM_UTF8)
+            else:
+                json_file.seek(0)
+            buffer, eof = read_chunk()
+            stripped = buffer.lstrip()
+            if not stripped.startswith("["):
+                raise ValueError("JSON root must be a list")
+            position = len(buffer) - len(stripped) + 1
+
+        # `offset` is the byte offset of buffer[counted]; only the consumed
+        # text is encoded again, so keeping it costs O(file) in total.
+        counted = 0
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+                position += 1
+
+            if position < len(buffer) and buffer[position] == "]":
+                return
+
+            try:
+                if position >= len(buffer):
+                    raise json.JSONDecodeError("Need more data", buffer, position)
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("JSON list is not closed or has a broken item") from None
+                chunk, eof = read_chunk()
+                offset += len(buffer[counted:position].encode("utf-8"))
+                buffer = buffer[position:] + chunk
+                position = counted = 0
+                continue
+
+            offset += len(buffer[counted:position].encode("utf-8"))
+            counted = position
+            yield item, offset
+
+
+def iter_csv_rows_with_offset(
+    file_path: Path,
+    start_offset: int = 0,
+) -> Iterator[tuple[dict[str, str], int]]:
+    """Yield (row, byte offset right after the row), starting from a saved offset."""
+    import csv
+
+    with file_path.open("rb") as csv_file:
+        header_line = csv_file.readline().decode("utf-8-sig")
+        fieldnames = next(csv.reader([header_line]), None)
+        if not fieldnames:
+            raise ValueError("CSV file must include headers")
+
+        offset = csv_file.tell()
+        if start_offset > offset:
+            csv_file.seek(start_offset)
+            offset = start_offset
+
+        def decoded_lines() -> Iterator[str]:
+            nonlocal offset
+            for raw_line in csv_file:
+                offset += len(raw_line)
+                yield raw_line.decode("utf-8")
+
+        # csv.reader pulls only the lines of the current record, so the offset
+        # seen after each row is exactly where the next row starts.
+        for row in csv.DictReader(decoded_lines(), fieldnames=fieldnames):
+            yield row, offset
+
+
+def start_import_run(
+    cur: Any,
+    file_kind: str,
+    file_path: Path,
+    content_hash: str,
+    batch_size: int,
+    resume: bool,
+) -> tuple[int, int, int, dict[str, int]]:
+    if resume:
+        cur.execute(
+            """
+            SELECT id, items_done, byte_offset, stats
+            FROM import_runs
+            WHERE file_kind = %s
+              AND content_hash = %s
+              AND status = 'running'
+            ORDER BY id DESC
+            LIMIT 1;
+            """,
+            (file_kind, content_hash),
+        )
+        row = cur.fetchone()
+        if row:
+            print(f"Resuming import run #{row[0]} after {row[1]} committed rows.")
+            return int(row[0]), int(row[1]), int(row[2]), dict(row[3])
+        print("No unfinished import for this file. Starting from the beginning.")
+
+    cur.execute(
+        """
+        INSERT INTO import_runs(file_path, file_kind, content_hash, batch_size)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id;
+        """,
+        (str(file_path), file_kind, content_hash, batch_size),
+    )
+    row = cur.fetchone()
+    return int(row[0]), 0, 0, {}
+
+
+def save_import_checkpoint(
+    cur: Any,
+    run_id: int,
+    items_done: int,
+    byte_offset: int,
+    stats: dict[str, int],
+    status: str = "running",
+) -> None:
+    import json
+
+    cur.execute(
+        """
+        UPDATE import_runs
+        SET items_done = %s,
+            byte_offset = %s,
+            stats = %s::JSONB,
+            status = %s,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = %s;
+        """,
+        (items_done, byte_offset, json.dumps(stats), status, run_id),
+    )
+
+
+def import_contacts_checkpointed(
+    file_path: Path,
+    file_kind: str,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    resume: bool = False,
+    on_duplicate: str = "ask",
+) -> dict[str, int]:
+    """Import JSON/CSV in committed batches, saving a checkpoint with every batch.
+
+    The checkpoint update runs in the same transaction as the batch, so after a
+    crash `resume=True` continues exactly after the last committed row.
+    """
+    from functools import partial
+    from itertools import islice
+
+    if batch_size <= 0:
+        raise ValueError("Batch size must be greater than 0")
+
+    content_hash = file_content_hash(file_path)
+    stats = {"inserted": 0, "updated": 0, "invalid": 0}
+    if file_kind == "json":
+        stats["skipped"] = 0
+
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            run_id, items_done, byte_offset, saved_stats = start_import_run(
+                cur, file_kind, file_path, content_hash, batch_size, resume
+            )
+            stats.update(saved_stats)
+            conn.commit()
+
+            if file_kind == "json":
+                if byte_offset == 0 and items_done > 0:
+                    # Run saved before JSON checkpoints had offsets: skip by count
+                    rows = islice(iter_json_array_with_offset(file_path), items_done, None)
+                else:
+                    rows = iter_json_array_with_offset(file_path, byte_offset)
+                import_row = partial(import_json_item, on_duplicate=on_duplicate)
+            else:
+                rows = iter_csv_rows_with_offset(file_path, byte_offset)
+                import_row = import_csv_row
+
+            pending = 0
+            for row, row_end_offset in rows:
+                items_done += 1
+                cur.execute("SAVEPOINT import_row;")
+                try:
+                    import_row(cur, row, stats)
+                    cur.execute("RELEASE SAVEPOINT import_row;")
+                except Exception as exc:  # noqa: BLE001 - keep the batch, drop only this row
+                    cur.execute("ROLLBACK TO SAVEPOINT import_row;")
+                    print(f"{file_kind.upper()} row {items_done} skipped: {exc}")
+                    stats["invalid"] += 1
+
+                byte_offset = row_end_offset
+                pending += 1
+                if pending >= batch_size:
+                    save_import_checkpoint(cur, run_id, items_done, byte_offset, stats)
+                    conn.commit()
+                    pending = 0
+
+            save_import_checkpoint(cur, run_id, items_done, byte_offset, stats, status="done")
+            conn.commit()
+
+    return stats
+
+
 def choose_sort_option() -> str:
     print("Sort options:")
     print("1. name")
@@ -641,6 +927,8 @@ def pagination_loop(limit: int) -> None:
 
 
 def interactive_menu() -> None:
+    from pathlib import Path
+
     while True:
         print("\nTSIS 01 PhoneBook Menu")
         print("1. Multi-field search (name/surname/email/phone)")
@@ -654,6 +942,7 @@ def interactive_menu() -> None:
         print("9. Import contacts from CSV (extended)")
         print("10. List all contacts with sorting")
         print("11. Reinitialize DB objects")
+        print("12. Find and merge duplicate contacts")
         print("0. Exit")
 
         choice = input("Choose option: ").strip()
@@ -728,6 +1017,15 @@ def interactive_menu() -> None:
                 init_db()
                 print("DB objects reinitialized.")
 
+            elif choice == "12":
+                from dedupe import dedupe_contacts
+
+                dedupe_contacts(dry_run=True)
+                confirm = input("Merge these clusters? (yes/no): ").strip().lower()
+                if confirm == "yes":
+                    stats = dedupe_contacts()
+                    print(f"Dedupe done. clusters={stats['clusters']}, merged={stats['merged']}")
+
             elif choice == "0":
                 print("Goodbye.")
                 break
@@ -741,6 +1039,168 @@ def interactive_menu() -> None:
             print(f"Database error: {exc}")
 
 
+def add_checkpoint_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help=f"Commit every N rows and save a checkpoint (default with --resume: {IMPORT_BATCH_SIZE}).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last unfinished checkpointed import of the same file.",
+    )
+
+
+def run_import(args: argparse.Namespace, file_kind: str) -> dict[str, int]:
+    from pathlib import Path
+
+    file_path = Path(args.file)
+    if args.batch_size is None and not args.resume:
+        if file_kind == "json":
+            return import_contacts_from_json(file_path, args.on_duplicate)
+        return import_contacts_from_csv(file_path)
+
+    return import_contacts_checkpointed(
+        file_path,
+        file_kind,
+        batch_size=args.batch_size or IMPORT_BATCH_SIZE,
+        resume=args.resume,
+        on_duplicate=getattr(args, "on_duplicate", "ask"),
+    )
+
+
+def batch_line_to_argv(line: str) -> list[str]:
+    """Turn one batch line (CLI syntax or a JSON object) into argv tokens."""
+    import json
+    import shlex
+
+    if not line.startswith("{"):
+        return shlex.split(line)
+
+    payload = json.loads(line)
+    if not isinstance(payload, dict) or "command" not in payload:
+        raise ValueError('JSON command must be an object with a "command" key')
+
+    argv = [str(payload.pop("command"))]
+    for key, value in payload.items():
+        option = "--" + key.replace("_", "-")
+        if value is True:
+            argv.append(option)
+        elif value is False or value is None:
+            continue
+        else:
+            argv.extend([option, str(value)])
+    return argv
+
+
+def parse_batch_command(parser: argparse.ArgumentParser, line: str) -> argparse.Namespace:
+    argv = batch_line_to_argv(line)
+    # argparse would print the help text to stdout, which must carry
+    # only one JSON object per line
+    if "-h" in argv or "--help" in argv:
+        raise ValueError(f"help is not available in batch mode: {line}")
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit:
+        raise ValueError(f"invalid command: {line}") from None
+
+    if args.command is None or args.command in BATCH_UNSUPPORTED_COMMANDS:
+        raise ValueError(f"command not supported in batch mode: {args.command or 'menu'}")
+    if args.command in {"import-json", "import-csv"} and (args.batch_size or args.resume):
+        raise ValueError("checkpointed imports commit on their own, run them outside batch")
+    if getattr(args, "on_duplicate", None) == "ask":
+        raise ValueError("use --on-duplicate skip or overwrite in batch mode")
+    return args
+
+
+def execute_batch_command(args: argparse.Namespace) -> Any:
+    """Run one parsed command and return a JSON-friendly result."""
+    from pathlib import Path
+
+    if args.command == "init":
+        init_db()
+        return None
+    if args.command == "search":
+        return search_contacts(args.query)
+    if args.command == "list":
+        return list_contacts(group_name=args.group, email_part=args.email, sort_by=args.sort)
+    if args.command == "add-phone":
+        call_add_phone(args.contact, args.phone, args.type)
+        return None
+    if args.command == "move-group":
+        call_move_to_group(args.contact, args.group)
+        return None
+    if args.command == "export-json":
+        return {"exported": export_contacts_to_json(Path(args.file))}
+    if args.command == "import-json":
+        return run_import(args, "json")
+    if args.command == "import-csv":
+        return run_import(args, "csv")
+    if args.command == "dedupe":
+        from dedupe import dedupe_contacts
+
+        return dedupe_contacts(
+            threshold=args.threshold,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+    raise ValueError(f"unknown command: {args.command}")
+
+
+def run_batch(lines: Iterator[str], commit_every: int = BATCH_COMMIT_EVERY) -> dict[str, int]:
+    """Execute newline-delimited commands over one connection, printing JSON results.
+
+    Each command runs inside a savepoint, so a failing line is rolled back alone;
+    the transaction is committed every `commit_every` commands.
+    """
+    import json
+    from contextlib import redirect_stdout
+
+    if commit_every <= 0:
+        raise ValueError("commit-every must be greater than 0")
+
+    parser = build_parser()
+    stats = {"ok": 0, "failed": 0}
+
+    with shared_connection() as conn:
+        with conn.cursor() as cur:
+            pending = 0
+            for line_number, raw_line in enumerate(lines, start=1):
+                line = raw_line.strip()
+                if line == "" or line.startswith("#"):
+                    continue
+
+                result: dict[str, Any] = {"line": line_number}
+                cur.execute("SAVEPOINT batch_command;")
+                try:
+                    args = parse_batch_command(parser, line)
+                    result["command"] = args.command
+                    # Command output (row warnings, reports) goes to stderr,
+                    # stdout carries only one JSON result per line.
+                    with redirect_stdout(sys.stderr):
+                        result["result"] = execute_batch_command(args)
+                    cur.execute("RELEASE SAVEPOINT batch_command;")
+                    result["ok"] = True
+                    stats["ok"] += 1
+                except Exception as exc:  # noqa: BLE001 - report and continue with next line
+                    cur.execute("ROLLBACK TO SAVEPOINT batch_command;")
+                    result["ok"] = False
+                    result["error"] = str(exc)
+                    stats["failed"] += 1
+
+                print(json.dumps(result, default=str), flush=True)
+
+                pending += 1
+                if pending >= commit_every:
+                    conn.commit()
+                    pending = 0
+
+            conn.commit()
+
+    return stats
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="TSIS 01 Extended PhoneBook")
     subparsers = parser.add_subparsers(dest="command")
@@ -783,61 +1243,131 @@ def build_parser() -> argparse.ArgumentParser:
 
     import_json_parser = subparsers.add_parser("import-json", help="Import contacts from JSON.")
     import_json_parser.add_argument("--file", required=True, help="Input JSON file path.")
+    add_checkpoint_arguments(import_json_parser)
+    import_json_parser.add_argument(
+        "--on-duplicate",
+        choices=DUPLICATE_ACTIONS,
+        default="ask",
+        help="What to do with an existing contact of the same name.",
+    )
 
     import_csv_parser = subparsers.add_parser("import-csv", help="Import contacts from CSV.")
     import_csv_parser.add_argument("--file", required=True, help="Input CSV file path.")
+    add_checkpoint_arguments(import_csv_parser)
+
+    dedupe_parser = subparsers.add_parser("dedupe", help="Find and merge duplicate contacts.")
+    dedupe_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEDUPE_THRESHOLD,
+        help="Minimum similarity score (0..1) to treat two contacts as duplicates.",
+    )
+    dedupe_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEDUPE_BATCH_SIZE,
+        help="Clusters merged per transaction.",
+    )
+    dedupe_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only print the duplicate report, do not merge.",
+    )
+
+    batch_parser = subparsers.add_parser(
+        "batch",
+        help="Run many commands (CLI syntax or JSON lines) over one connection.",
+    )
+    batch_parser.add_argument("--file", help="Commands file (default: read stdin).")
+    batch_parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=BATCH_COMMIT_EVERY,
+        help="Commit the transaction after this many commands.",
+    )
 
     return parser
 
 
-def main() -> None:
-    parser = build_parser()
-    args = parser.parse_args()
+def run_command(args: argparse.Namespace) -> None:
+    if args.command == "init":
+        init_db()
+        print("TSIS 01 schema and SQL objects are ready.")
 
-    init_db()
+    elif args.command == "search":
+        print_contacts(search_contacts(args.query))
 
-    try:
-        if args.command == "init":
-            print("TSIS 01 schema and SQL objects are ready.")
+    elif args.command == "list":
+        rows = list_contacts(group_name=args.group, email_part=args.email, sort_by=args.sort)
+        print_contacts(rows)
 
-        elif args.command == "search":
-            print_contacts(search_contacts(args.query))
+    elif args.command == "page":
+        pagination_loop(args.limit)
 
-        elif args.command == "list":
-            rows = list_contacts(group_name=args.group, email_part=args.email, sort_by=args.sort)
-            print_contacts(rows)
+    elif args.command == "add-phone":
+        call_add_phone(args.contact, args.phone, args.type)
+        print("Phone added successfully.")
 
-        elif args.command == "page":
-            pagination_loop(args.limit)
+    elif args.command == "move-group":
+        call_move_to_group(args.contact, args.group)
+        print("Contact moved to group.")
 
-        elif args.command == "add-phone":
-            call_add_phone(args.contact, args.phone, args.type)
-            print("Phone added successfully.")
+    elif args.command == "export-json":
+        from pathlib import Path
 
-        elif args.command == "move-group":
-            call_move_to_group(args.contact, args.group)
-            print("Contact moved to group.")
+        count = export_contacts_to_json(Path(args.file))
+        print(f"Exported contacts: {count}")
 
-        elif args.command == "export-json":
-            count = export_contacts_to_json(Path(args.file))
-            print(f"Exported contacts: {count}")
+    elif args.command == "import-json":
+        stats = run_import(args, "json")
+        print(
+            f"JSON import done. inserted={stats['inserted']}, "
+            f"updated={stats['updated']}, skipped={stats['skipped']}, invalid={stats['invalid']}"
+        )
 
-        elif args.command == "import-json":
-            stats = import_contacts_from_json(Path(args.file))
-            print(
-                f"JSON import done. inserted={stats['inserted']}, "
-                f"updated={stats['updated']}, skipped={stats['skipped']}, invalid={stats['invalid']}"
-            )
+    elif args.command == "import-csv":
+        stats = run_import(args, "csv")
+        print(
+            f"CSV import done. inserted={stats['inserted']}, "
+            f"updated={stats['updated']}, invalid={stats['invalid']}"
+        )
 
-        elif args.command == "import-csv":
-            stats = import_contacts_from_csv(Path(args.file))
-            print(
-                f"CSV import done. inserted={stats['inserted']}, "
-                f"updated={stats['updated']}, invalid={stats['invalid']}"
-            )
+    elif args.command == "batch":
+        if args.file:
+            with open(args.file, "r", encoding="utf-8") as commands_file:
+                stats = run_batch(commands_file, args.commit_every)
+        else:
+            stats = run_batch(sys.stdin, args.commit_every)
+        print(f"Batch done. ok={stats['ok']}, failed={stats['failed']}", file=sys.stderr)
+
+    elif args.command == "dedupe":
+        from dedupe import dedupe_contacts
 
+        stats = dedupe_contacts(
+            threshold=args.threshold,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+        print(f"Dedupe done. clusters={stats['clusters']}, merged={stats['merged']}")
+
+    else:
+        interactive_menu()
+
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    try:
+        if args.command in INTERACTIVE_COMMANDS or args.command in OWN_TRANSACTION_COMMANDS:
+            ensure_db()
+            run_command(args)
         else:
-            interactive_menu()
+            # One-shot commands use a single connection for the schema check and the work.
+            with shared_connection():
+                if args.command != "init":
+                    ensure_db()
+                run_command(args)
 
     except Exception as exc:  # noqa: BLE001 - final friendly message
         print(f"Error: {exc}")
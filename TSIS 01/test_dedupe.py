@@ -0,0 +1,126 @@
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import connect
+import dedupe
+import phonebook
+
+
+class FakeDatabase:
+    """Merged cluster ids that were committed, across all connections."""
+
+    def __init__(self):
+        self.committed = []
+
+
+class FakeConnection:
+    """Enough of a psycopg connection for the dedupe merge path.
+
+    Like psycopg, the first statement opens a transaction, and
+    transaction() is a savepoint when one is already open.
+    """
+
+    def __init__(self, database, fail_survivor):
+        self.database = database
+        self.fail_survivor = fail_survivor
+        self.in_transaction = False
+        self.pending = []
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.database.committed.extend(self.pending)
+        self.pending = []
+        self.in_transaction = False
+
+    def rollback(self):
+        self.pending = []
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+    @contextmanager
+    def transaction(self):
+        if self.in_transaction:
+            saved = list(self.pending)
+            try:
+                yield
+            except Exception:
+                self.pending = saved
+                raise
+            return
+        self.in_transaction = True
+        try:
+            yield
+        except Exception:
+            self.rollback()
+            raise
+        self.commit()
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.in_transaction = True
+        if "UPDATE contacts" in sql:
+            survivor_id = params[-1]
+            if survivor_id == self.conn.fail_survivor:
+                raise RuntimeError("merge failed")
+            self.conn.pending.append(survivor_id)
+
+    def fetchone(self):
+        return (False,)
+
+
+def make_cluster(survivor_id):
+    survivor = {"id": survivor_id, "email": None, "birthday": None, "group_id": None, "group": "Other"}
+    duplicate = {"id": survivor_id + 100, "email": None, "birthday": None, "group_id": None, "group": "Other"}
+    return {"survivor": survivor, "duplicates": [duplicate], "score": 1.0}
+
+
+def check_schema():
+    # Like ensure_db(): one query, which opens a transaction on a shared connection
+    with connect.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version FROM schema_version;")
+
+
+def test_failed_dedupe_batch_keeps_earlier_batches(monkeypatch):
+    database = FakeDatabase()
+    clusters = [make_cluster(survivor_id) for survivor_id in (1, 2, 3, 4)]
+
+    monkeypatch.setattr(connect, "_connect", lambda: FakeConnection(database, fail_survivor=3))
+    monkeypatch.setattr(phonebook, "ensure_db", check_schema)
+    monkeypatch.setattr(dedupe, "load_contact_profiles", lambda: [])
+    monkeypatch.setattr(dedupe, "find_duplicate_clusters", lambda profiles, threshold: clusters)
+    monkeypatch.setattr(dedupe, "print_duplicate_report", lambda found: None)
+    monkeypatch.setattr(sys, "argv", ["phonebook.py", "dedupe", "--batch-size", "1"])
+
+    phonebook.main()
+
+    # Batch 3 fails: batches 1 and 2 stay committed, batch 4 never runs
+    assert database.committed == [1, 2]
@@ -0,0 +1,88 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pygame
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from document import (ADD_SHAPE, read_document, decode_item, encode_item, encode_delete,
+                      write_document, append_records)
+
+# Project file benchmark: a drawing of many freehand strokes is written in
+# full, its record index read back, a few changes appended, and every item
+# decoded and drawn the way the app does it while opening a project.
+
+CANVAS_SIZE = (1000, 560)
+
+
+def make_strokes(count, seed):
+    rng = random.Random(seed)
+    w, h = CANVAS_SIZE
+    strokes = []
+    for seq in range(count):
+        x, y = rng.randrange(w), rng.randrange(h)
+        points = []
+        for _ in range(rng.randrange(5, 40)):
+            x = min(max(x + rng.randrange(-8, 9), 0), w - 1)
+            y = min(max(y + rng.randrange(-8, 9), 0), h - 1)
+            points.append((x, y))
+        color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+        strokes.append({"type": "stroke", "points": points, "color": color,
+                        "width": rng.choice([2, 5, 10]), "seq": seq})
+    return strokes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project file benchmark")
+    parser.add_argument("--strokes", type=int, default=100_000)
+    parser.add_argument("--changes", type=int, default=50, help="Strokes added and removed before the append.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pygame.init()
+    strokes = make_strokes(args.strokes, args.seed)
+    points = sum(len(s["points"]) for s in strokes)
+    print(f"{len(strokes)} strokes, {points} points")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.pnt"
+
+        start = time.perf_counter()
+        length = write_document(path, CANVAS_SIZE, (encode_item(ADD_SHAPE, s) for s in strokes))
+        print(f"  full save: {(time.perf_counter() - start) * 1000:8.1f} ms, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+        added = make_strokes(args.changes, args.seed + 1)
+        for i, stroke in enumerate(added):
+            stroke["seq"] = len(strokes) + i
+        start = time.perf_counter()
+        records = [encode_delete(s["seq"]) for s in strokes[:args.changes]]
+        records += [encode_item(ADD_SHAPE, s) for s in added]
+        append_records(path, length, records)
+        print(f"     append: {(time.perf_counter() - start) * 1000:8.1f} ms "
+              f"(+{len(added)} -{args.changes})")
+
+        start = time.perf_counter()
+        doc = read_document(path)
+        print(f" read index: {(time.perf_counter() - start) * 1000:8.1f} ms, "
+              f"{len(doc['pending'])} live items")
+
+        # What paint.py does per item while opening, minus the hit grid
+        canvas = pygame.Surface(CANVAS_SIZE)
+        canvas.fill((255, 255, 255))
+        start = time.perf_counter()
+        for kind, payload in doc["pending"]:
+            item = decode_item(kind, payload)
+            pygame.draw.lines(canvas, item["color"], False, item["points"], item["width"])
+        elapsed = time.perf_counter() - start
+        print(f"decode+draw: {elapsed * 1000:8.1f} ms, "
+              f"{elapsed / len(doc['pending']) * 1e6:.1f} us per item")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
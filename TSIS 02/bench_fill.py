@@ -0,0 +1,95 @@
+import argparse
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import pygame
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from tools import flood_fill
+
+# Full-canvas flood fill benchmark: the old get_at/set_at BFS against the
+# scanline fill in tools.py, on an empty canvas and on one with many shapes.
+# Also checks that both fills paint exactly the same pixels.
+
+CANVAS_SIZE = (1000, 560)
+
+
+# The BFS flood fill tools.py used before, kept here for comparison
+def legacy_flood_fill(surface, start, fill_color):
+    x0, y0 = start
+    w, h = surface.get_size()
+    target_color = tuple(surface.get_at((x0, y0))[:3])
+    new_color = tuple(fill_color[:3])
+    if target_color == new_color:
+        return
+    visited = [[False] * w for _ in range(h)]
+    queue = deque([(x0, y0)])
+    visited[y0][x0] = True
+    while queue:
+        x, y = queue.popleft()
+        if tuple(surface.get_at((x, y))[:3]) != target_color:
+            continue
+        surface.set_at((x, y), new_color)
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if 0 <= nx < w and 0 <= ny < h and not visited[ny][nx]:
+                visited[ny][nx] = True
+                queue.append((nx, ny))
+
+
+def make_canvas(shapes, seed):
+    canvas = pygame.Surface(CANVAS_SIZE)
+    canvas.fill((255, 255, 255))
+    rng = random.Random(seed)
+    w, h = CANVAS_SIZE
+    for _ in range(shapes):
+        color = (rng.randrange(200), rng.randrange(200), rng.randrange(200))
+        a = (rng.randrange(w), rng.randrange(h))
+        b = (rng.randrange(w), rng.randrange(h))
+        if rng.random() < 0.5:
+            pygame.draw.line(canvas, color, a, b, rng.choice([1, 2, 5]))
+        else:
+            rect = pygame.Rect(min(a[0], b[0]), min(a[1], b[1]),
+                               abs(a[0] - b[0]) // 3 + 1, abs(a[1] - b[1]) // 3 + 1)
+            pygame.draw.ellipse(canvas, color, rect, 2)
+    return canvas
+
+
+def time_fill(fill, canvas, repeats):
+    best = None
+    result = None
+    for _ in range(repeats):
+        surface = canvas.copy()
+        start = time.perf_counter()
+        fill(surface, (CANVAS_SIZE[0] // 2, CANVAS_SIZE[1] // 2), (255, 165, 0))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        result = surface
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flood fill benchmark")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--shapes", type=int, default=300, help="Shapes on the busy canvas.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the scanline fill.")
+    args = parser.parse_args()
+
+    pygame.init()
+    for name, canvas in (("empty canvas", make_canvas(0, args.seed)),
+                         (f"{args.shapes} shapes", make_canvas(args.shapes, args.seed))):
+        new_s, new_surface = time_fill(flood_fill, canvas, args.repeats)
+        line = f"{name:>12}: scanline {new_s * 1000:8.1f} ms"
+        if not args.skip_legacy:
+            old_s, old_surface = time_fill(legacy_flood_fill, canvas, 1)
+            same = pygame.image.tobytes(new_surface, "RGB") == pygame.image.tobytes(old_surface, "RGB")
+            line += f" | BFS {old_s * 1000:9.1f} ms, x{old_s / new_s:.0f}, identical: {same}"
+        print(line)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
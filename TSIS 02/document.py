@@ -0,0 +1,237 @@
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+
+import pygame
+
+# Paint project files (.pnt): the drawing as items, not pixels, so it can
+# be opened again and edited.
+#
+# A header, then records of <kind: 1 byte> <payload length: 4 bytes> <payload>.
+# An ADD record holds one item and its seq number; a DELETE record removes
+# the item with that seq. Reading replays the records in file order.
+#
+# Saving appends records only for what changed since the last save. A crash
+# during an append can only leave a short last record, which the reader
+# skips. Once most records are dead, the file is rewritten from scratch.
+#
+# Points are packed little-endian int16 arrays, turned back into numbers
+# by array() in C, so even very large documents open quickly.
+
+MAGIC = b"PNTD"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBHH")   # magic, version, canvas width, canvas height
+RECORD = struct.Struct("<BI")      # kind, payload length
+SEQ    = struct.Struct("<I")       # every payload starts with the item's seq
+SHAPE  = struct.Struct("<IB3BH")   # seq, shape type, r, g, b, width; then points
+FILL   = struct.Struct("<I3B6h")   # seq, r, g, b, pos x, y, rect x, y, w, h; then mask
+TEXT   = struct.Struct("<I3B2h")   # seq, r, g, b, pos x, y; then UTF-8 text
+
+ADD_SHAPE, ADD_ERASE, ADD_FILL, ADD_TEXT, DELETE = 1, 2, 3, 4, 5
+
+SHAPE_TYPES = ["stroke", "line", "rectangle", "square", "circle", "right_tri", "eq_tri", "rhombus"]
+SHAPE_CODES = {name: i for i, name in enumerate(SHAPE_TYPES)}
+
+# Points a shape record must hold: strokes need at least one, lines two
+# ends, rects a corner and a size, polygons at least three corners
+def points_ok(shape_type, count):
+    if shape_type == "stroke":
+        return count >= 1
+    if shape_type in ("line", "rectangle", "square", "circle"):
+        return count == 2
+    return count >= 3
+
+BIG_ENDIAN = sys.byteorder == "big"
+
+
+def pack_points(points):
+    flat = array("h", [c for point in points for c in point])
+    if BIG_ENDIAN:
+        flat.byteswap()
+    return flat.tobytes()
+
+
+def unpack_points(data):
+    flat = array("h")
+    flat.frombytes(data)
+    if BIG_ENDIAN:
+        flat.byteswap()
+    return list(zip(flat[0::2], flat[1::2]))
+
+
+def record(kind, payload):
+    return RECORD.pack(kind, len(payload)) + payload
+
+
+# -----------------------------------------------------------------------------
+# Items <-> records
+# -----------------------------------------------------------------------------
+
+def encode_item(kind, item):
+    seq = item["seq"]
+    r, g, b = item["color"][:3]
+
+    if kind in (ADD_SHAPE, ADD_ERASE):
+        shape_type = item["type"]
+        if shape_type == "line":
+            points = [item["p1"], item["p2"]]
+        elif shape_type in ("rectangle", "square", "circle"):
+            rect = pygame.Rect(item["rect"])
+            points = [rect.topleft, rect.size]
+        else:
+            points = item["points"]
+        header = SHAPE.pack(seq, SHAPE_CODES[shape_type], r, g, b, int(item["width"]))
+        return record(kind, header + pack_points(points))
+
+    if kind == ADD_FILL:
+        rect = item["rect"]
+        flags = item["mask"].to_surface(setcolor=(255, 255, 255, 255), unsetcolor=(0, 0, 0, 255))
+        bits = pygame.image.tobytes(flags, "RGB")[::3]
+        header = FILL.pack(seq, r, g, b, *item["pos"], *rect)
+        return record(kind, header + zlib.compress(bits))
+
+    if kind == ADD_TEXT:
+        header = TEXT.pack(seq, r, g, b, *item["pos"])
+        return record(kind, header + item["text"].encode("utf-8"))
+
+    raise ValueError(f"unknown item kind {kind}")
+
+
+def encode_delete(seq):
+    return record(DELETE, SEQ.pack(seq))
+
+
+# Item dict from an ADD record payload. Text items come back without their
+# rendered "image"; the app renders them with its own font.
+# A damaged record raises ValueError.
+def decode_item(kind, payload):
+    try:
+        return _decode_item(kind, payload)
+    except (struct.error, zlib.error, pygame.error, UnicodeDecodeError, IndexError) as exc:
+        raise ValueError(f"damaged record: {exc}") from None
+
+
+def _decode_item(kind, payload):
+    if kind in (ADD_SHAPE, ADD_ERASE):
+        seq, code, r, g, b, width = SHAPE.unpack_from(payload)
+        points = unpack_points(payload[SHAPE.size:])
+        if code >= len(SHAPE_TYPES) or not points_ok(SHAPE_TYPES[code], len(points)):
+            raise ValueError(f"damaged record: bad shape {code} with {len(points)} points")
+        item = {"type": SHAPE_TYPES[code], "color": (r, g, b), "width": width, "seq": seq}
+        if item["type"] == "line":
+            item["p1"], item["p2"] = points
+        elif item["type"] in ("rectangle", "square", "circle"):
+            item["rect"] = pygame.Rect(points[0], points[1])
+        else:
+            item["points"] = points
+        return item
+
+    if kind == ADD_FILL:
+        seq, r, g, b, px, py, x, y, w, h = FILL.unpack_from(payload)
+        if w <= 0 or h <= 0:
+            raise ValueError(f"damaged record: fill of size {w}x{h}")
+        bits = zlib.decompress(payload[FILL.size:])
+        flags = pygame.image.frombytes(bits, (w, h), "P")
+        flags.set_colorkey(0)
+        return {"pos": (px, py), "color": (r, g, b), "rect": pygame.Rect(x, y, w, h),
+                "mask": pygame.mask.from_surface(flags), "seq": seq}
+
+    if kind == ADD_TEXT:
+        seq, r, g, b, px, py = TEXT.unpack_from(payload)
+        text = bytes(payload[TEXT.size:]).decode("utf-8")
+        return {"pos": (px, py), "text": text, "color": (r, g, b), "seq": seq}
+
+    raise ValueError(f"unknown item kind {kind}")
+
+
+# -----------------------------------------------------------------------------
+# Files
+# -----------------------------------------------------------------------------
+
+# Reads the record index only; items are decoded later, one by one, with
+# decode_item(). Returns a dict with:
+#   size     - canvas size the drawing was made on
+#   seqs     - seq numbers of the live items, in order
+#   pending  - [(kind, payload), ...] of those items
+#   records  - number of complete records in the file (live or not)
+#   length   - file length up to the end of the last complete record
+#   next_seq - first seq number no record uses
+def read_document(path):
+    data = Path(path).read_bytes()
+    if len(data) < HEADER.size:
+        raise ValueError("not a Paint project")
+    magic, version, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a Paint project")
+    if version != VERSION:
+        raise ValueError(f"unsupported Paint project version {version}")
+
+    # One pass over the records; this loop is most of the time an open
+    # takes, so the struct lookups are kept out of it
+    view = memoryview(data)
+    size = len(data)
+    unpack_record = RECORD.unpack_from
+    unpack_seq = SEQ.unpack_from
+    live = {}
+    pos = HEADER.size
+    records = 0
+    last_seq = -1
+    while pos + RECORD.size <= size:
+        kind, length = unpack_record(data, pos)
+        start = pos + RECORD.size
+        end = start + length
+        if end > size or length < SEQ.size:
+            break   # cut short by a crash while appending
+        seq, = unpack_seq(data, start)
+        if kind == DELETE:
+            live.pop(seq, None)
+        else:
+            live[seq] = (kind, view[start:end])
+        if seq > last_seq:
+            last_seq = seq
+        records += 1
+        pos = end
+
+    seqs = sorted(live)
+    return {
+        "size": (width, height),
+        "seqs": seqs,
+        "pending": [live[seq] for seq in seqs],
+        "records": records,
+        "length": pos,
+        "next_seq": last_seq + 1,
+    }
+
+
+# Writes a whole document, record by record, to a temp file that then
+# replaces 'path'. Returns the file length.
+def write_document(path, size, records):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, *size))
+            for rec in records:
+                f.write(rec)
+            length = f.tell()
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return length
+
+
+# Adds records at 'length' (dropping a short last record left by a crash).
+# Returns the new file length.
+def append_records(path, length, records):
+    with open(path, "r+b") as f:
+        f.seek(length)
+        f.truncate()
+        for rec in records:
+            f.write(rec)
+        return f.tell()
@@ -0,0 +1,75 @@
+import pygame
+
+# Undo/redo for the canvas, stored as pixels of the tiles an action touched.
+# Before an action the covered 64x64 tiles are copied, after it they are
+# copied again; undo pastes the "before" copies back and redo the "after"
+# copies, so either one costs a few tile blits no matter how long the
+# drawing history is.
+
+TILE_SIZE = 64
+HISTORY_BUDGET = 64 * 1024 * 1024   # bytes of tile copies kept in memory
+
+
+class TileHistory:
+    def __init__(self, surface, budget=HISTORY_BUDGET, tile_size=TILE_SIZE):
+        self.surface = surface
+        self.budget = budget
+        self.tile_size = tile_size
+        self.undo_stack = []   # oldest first
+        self.redo_stack = []
+        self.used = 0          # bytes held by both stacks
+        self.pending = None    # "before" tiles of the action in progress
+
+    # Tiles (clipped to the surface) that overlap a rectangle
+    def tiles_for(self, rect):
+        size = self.tile_size
+        rect = rect.clip(self.surface.get_rect())
+        if rect.width == 0 or rect.height == 0:
+            return []
+        tiles = []
+        for ty in range(rect.top // size, (rect.bottom - 1) // size + 1):
+            for tx in range(rect.left // size, (rect.right - 1) // size + 1):
+                tile = pygame.Rect(tx * size, ty * size, size, size)
+                tiles.append(tile.clip(self.surface.get_rect()))
+        return tiles
+
+    # Call before changing the pixels inside 'rect'
+    def begin(self, rect):
+        self.pending = [(tile, self.surface.subsurface(tile).copy())
+                        for tile in self.tiles_for(rect)]
+
+    # Call after the change; 'change' is whatever the app needs to undo
+    # the change to its own data, it is handed back by undo() and redo()
+    def commit(self, change):
+        tiles = [(tile, before, self.surface.subsurface(tile).copy())
+                 for tile, before in self.pending]
+        self.pending = None
+        size = 2 * self.surface.get_bytesize() * sum(t.width * t.height for t, _, _ in tiles)
+
+        for entry in self.redo_stack:
+            self.used -= entry["size"]
+        self.redo_stack = []
+
+        self.undo_stack.append({"tiles": tiles, "change": change, "size": size})
+        self.used += size
+        # Forget the oldest actions once over budget (always keep the newest)
+        while self.used > self.budget and len(self.undo_stack) > 1:
+            self.used -= self.undo_stack.pop(0)["size"]
+
+    def undo(self):
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        for tile, before, _ in entry["tiles"]:
+            self.surface.blit(before, tile)
+        self.redo_stack.append(entry)
+        return entry["change"]
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        for tile, _, after in entry["tiles"]:
+            self.surface.blit(after, tile)
+        self.undo_stack.append(entry)
+        return entry["change"]
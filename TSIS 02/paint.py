@@ -1,12 +1,17 @@
 import pygame
 import math
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
 # Import our helper tools from tools.py
 sys.path.insert(0, str(Path(__file__).resolve().parent))
-from tools import BRUSH_SIZES, flood_fill
+from tools import BRUSH_SIZES, ShapeGrid, fill_spans, spans_rect, spans_mask
+from history import TileHistory
+from saving import SAVE_DONE, BackgroundSaver
+from document import (ADD_SHAPE, ADD_ERASE, ADD_FILL, ADD_TEXT, read_document, decode_item,
+                      encode_item, encode_delete, write_document, append_records)
 
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 700
@@ -52,8 +57,31 @@ PALETTE = [
 # Labels for the size buttons (keyboard shortcuts shown in brackets)
 SIZE_LABELS = ["S (1)", "M (2)", "L (3)"]
 
+SAVE_MESSAGE_MS = 3000   # how long the "Saved" message stays in the toolbar
+
+# Ctrl+S saves PNG files here, compressed with this zlib level
+# (0 = fastest, 9 = smallest file)
+SCREENS_DIR = Path(__file__).resolve().parent / "screens"
+PNG_COMPRESSION = 6
+
+# Ctrl+Shift+S / Ctrl+O save and open the drawing as a project file
+# (document.py); "python paint.py other.pnt" works on another file
+DOCUMENT_FILE = Path(__file__).resolve().parent / "drawing.pnt"
+LOAD_SLICE_MS = 12   # drawing time per frame while a project is being opened
+
+# rebuild_canvas() restarts from a saved copy of the canvas instead of a blank
+# one: a copy is kept every CHECKPOINT_EVERY items, at most MAX_CHECKPOINTS
+# of them (about 2 MB each), dropping every other one when there are too many
+CHECKPOINT_EVERY = 25
+MAX_CHECKPOINTS = 16
+
+# Freehand strokes go into the shape grid as one box per run of this many
+# segments instead of one per segment: far fewer boxes and cells to fill
+STROKE_RUN = 8
+
+
 class PaintApp:
-    def __init__(self):
+    def __init__(self, document_path=None):
         pygame.init()
         pygame.display.set_caption("TSIS 02 - Paint Extended")
 
@@ -83,14 +111,29 @@ class PaintApp:
         self.brush_size_idx = 1  # 0=small, 1=medium, 2=large
 
         # Stored shapes — each shape is a dictionary describing what to draw.
-        # rebuild_canvas() redraws all of them from scratch.
+        # Every stored item also gets a "seq" number in the order it was made;
+        # rebuild_canvas() redraws items in that order.
         self.shapes = []
         self.erase_strokes = []
 
         # Flood fills and text are stored separately so they survive
         # a rebuild triggered by right-click shape deletion.
-        self.fills = []   # list of {"pos": (x,y), "color": (r,g,b)}
-        self.texts = []   # list of {"pos": (x,y), "text": str, "color": (r,g,b)}
+        # A fill keeps the pixels it painted as a mask, so a rebuild stamps
+        # it back instead of searching the area again.
+        self.fills = []   # list of {"pos", "color", "rect", "mask"}
+        self.texts = []   # list of {"pos", "text", "color", "image"}
+        self.next_seq = 0
+
+        # Copies of the canvas for rebuild_canvas(): seq -> Surface holding
+        # every item with a smaller seq
+        self.checkpoints = {}
+        self.items_since_checkpoint = 0
+
+        # Bounding boxes of every shape's parts, for right-click hit tests
+        self.shape_grid = ShapeGrid()
+
+        # Undo/redo (Ctrl+Z / Ctrl+Y) of every stored or deleted item
+        self.history = TileHistory(self.canvas)
 
         # State for drawing in progress
         self.is_drawing = False
@@ -105,12 +148,38 @@ class PaintApp:
 
         # Save notification — shows filename briefly after Ctrl+S
         self.save_message = None   # (message_string, timestamp_ms)
+        # PNG files are written by a background thread
+        self.saver = BackgroundSaver(PNG_COMPRESSION)
+
+        # Project file, and what changed since it was last saved, kept up to
+        # date by store_item()/unstore_item() so a save only appends that
+        self.document_path = Path(document_path) if document_path else DOCUMENT_FILE
+        self.doc_items = None     # live items in the file; None = not written or read yet
+        self.doc_added = {}       # seq -> (kind, item) stored since the last save
+        self.doc_removed = set()  # seqs in the file removed since the last save
+        self.doc_records = 0      # records in the file, live or not
+        self.doc_length = 0       # file length up to its last complete record
+        self.loading = None       # project being opened, see open_document()
+
+        # Screen redraw bookkeeping for draw(): only rectangles that changed
+        # are redrawn and sent to the display. The toolbar is kept drawn on
+        # its own surface (its bottom line overlaps the canvas by 2 pixels)
+        # and redrawn only when toolbar_state() changes.
+        self.dirty = [self.screen.get_rect()]   # screen rects to redraw
+        self.toolbar_surface = pygame.Surface((WINDOW_WIDTH, TOOLBAR_HEIGHT + 2), pygame.SRCALPHA)
+        self.toolbar_drawn = None               # toolbar_state() it shows
+        self.last_cursor = None                 # where the cursor was drawn
+        self.last_preview = None                # where the preview was drawn
+        self.preview_area = None                # all of it since it appeared
 
         # Custom cursors
         self.pen_cursor, self.pen_hotspot = self.make_pen_cursor()
         self.eraser_cursor, self.eraser_hotspot = self.make_eraser_cursor()
         pygame.mouse.set_visible(False)  # hide the default OS cursor
 
+        if document_path and self.document_path.exists():
+            self.open_document()
+
     def brush_size(self):
         return BRUSH_SIZES[self.brush_size_idx]
 
@@ -170,7 +239,6 @@ class PaintApp:
         pygame.draw.rect(surf, (95, 95, 100),   (4, 6, 18, 14), width=2, border_radius=4)
         return surf, (13, 13)
 
-
     def drag_rect(self, a, b):
         # Bounding rectangle that covers the drag from a to b
         return pygame.Rect(
@@ -267,27 +335,143 @@ class PaintApp:
         elif shape_type in ("right_tri", "eq_tri", "rhombus"):
             pygame.draw.polygon(surface, color, list(shape["points"]), width=width)
 
-    def rebuild_canvas(self):
-        self.canvas.fill((255, 255, 255))
-
-        # Redraw all vector shapes
-        for shape in self.shapes:
-            self.draw_shape(self.canvas, shape)
-
-        # Apply eraser strokes (white lines on top)
-        for stroke in self.erase_strokes:
-            self.draw_shape(self.canvas, stroke)
+    def draw_item(self, surface, item):
+        # Any stored item: a fill, a text label, a shape or an eraser stroke
+        if "mask" in item:
+            stamp = item["mask"].to_surface(setcolor=item["color"], unsetcolor=None)
+            surface.blit(stamp, item["rect"])
+        elif "image" in item:
+            surface.blit(item["image"], item["pos"])
+        else:
+            self.draw_shape(surface, item)
+
+    def all_items(self):
+        # Shapes, eraser strokes, fills and texts in the order they were made
+        items = self.shapes + self.erase_strokes + self.fills + self.texts
+        items.sort(key=lambda item: item["seq"])
+        return items
+
+    def count_for_checkpoint(self, next_seq):
+        # Called after each item drawn on the canvas; every CHECKPOINT_EVERY
+        # items the canvas is copied, holding every item before next_seq
+        self.items_since_checkpoint += 1
+        if self.items_since_checkpoint < CHECKPOINT_EVERY:
+            return
+        self.items_since_checkpoint = 0
+        self.checkpoints[next_seq] = self.canvas.copy()
+        if len(self.checkpoints) > MAX_CHECKPOINTS:
+            for seq in sorted(self.checkpoints)[::2]:
+                del self.checkpoints[seq]
+
+    def item_bounds(self, item):
+        # Canvas area that drawing the item can change (a little generous)
+        if "mask" in item:
+            rect = pygame.Rect(item["rect"])
+        elif "image" in item:
+            rect = item["image"].get_rect(topleft=item["pos"])
+        else:
+            if item["type"] in ("rectangle", "square", "circle"):
+                rect = pygame.Rect(item["rect"])
+            elif item["type"] == "line":
+                rect = self.points_bbox([item["p1"], item["p2"]])
+            else:
+                rect = self.points_bbox(list(item["points"]))
+            pad = 2 * int(item["width"]) + 2
+            rect = rect.inflate(pad, pad)
+        return rect.clip(self.canvas.get_rect())
+
+    def drop_checkpoints_after(self, seq):
+        # Checkpoints newer than an added or removed item no longer match
+        for key in list(self.checkpoints):
+            if key > seq:
+                del self.checkpoints[key]
+
+    def mark_canvas_dirty(self, rect):
+        # A canvas area (canvas coordinates) needs to be shown again
+        self.dirty.append(rect.move(0, TOOLBAR_HEIGHT))
+
+    def store_item(self, items, item):
+        # Put an item into its list at its place in drawing order
+        i = len(items)
+        while i > 0 and items[i - 1]["seq"] > item["seq"]:
+            i -= 1
+        items.insert(i, item)
+        if items is self.shapes:
+            self.shape_grid.add(item["seq"], item, self.hit_boxes(item))
+        # A redo or undone delete may bring back an item the file still has
+        if item["seq"] in self.doc_removed:
+            self.doc_removed.discard(item["seq"])
+        else:
+            self.doc_added[item["seq"]] = (self.item_kind(items), item)
+        self.drop_checkpoints_after(item["seq"])
+        self.mark_canvas_dirty(self.item_bounds(item))
+
+    def unstore_item(self, items, item):
+        items.remove(item)
+        if items is self.shapes:
+            self.shape_grid.remove(item["seq"])
+        if self.doc_added.pop(item["seq"], None) is None:
+            self.doc_removed.add(item["seq"])
+        self.drop_checkpoints_after(item["seq"])
+        self.mark_canvas_dirty(self.item_bounds(item))
+
+    def add_item(self, items, item):
+        # Store a new item and draw it straight onto the canvas
+        item["seq"] = self.next_seq
+        self.next_seq += 1
+        self.history.begin(self.item_bounds(item))
+        self.store_item(items, item)
+        self.draw_item(self.canvas, item)
+        self.history.commit(("add", items, item))
+        self.count_for_checkpoint(self.next_seq)
+
+    def undo(self):
+        # The history puts the canvas pixels back; the item lists follow
+        if self.loading:
+            return
+        change = self.history.undo()
+        if change is None:
+            return
+        action, items, item = change
+        if action == "add":
+            self.unstore_item(items, item)
+        else:
+            self.store_item(items, item)
 
-        # Replay every flood fill in the order they were made
-        for f in self.fills:
-            flood_fill(self.canvas, f["pos"], f["color"])
+    def redo(self):
+        if self.loading:
+            return
+        change = self.history.redo()
+        if change is None:
+            return
+        action, items, item = change
+        if action == "add":
+            self.store_item(items, item)
+        else:
+            self.unstore_item(items, item)
 
-        # Replay every text label
-        for t in self.texts:
-            rendered = self.text_font.render(t["text"], True, t["color"])
-            self.canvas.blit(rendered, t["pos"])
+    def rebuild_canvas(self, from_seq=0):
+        # Redraw the canvas after the item with seq 'from_seq' was removed.
+        # Start from the newest checkpoint taken before that item; the ones
+        # after it still show the removed item, so they are thrown away.
+        self.drop_checkpoints_after(from_seq)
+        start = max(self.checkpoints, default=0)
 
-    def shape_hit(self, pt, shape):
+        if start in self.checkpoints:
+            self.canvas.blit(self.checkpoints[start], (0, 0))
+        else:
+            self.canvas.fill((255, 255, 255))
+
+        # Redraw only the items made after that checkpoint
+        self.items_since_checkpoint = 0
+        for item in self.all_items():
+            if item["seq"] >= start:
+                self.draw_item(self.canvas, item)
+                self.count_for_checkpoint(item["seq"] + 1)
+
+    def shape_hit(self, pt, shape, runs=None):
+        # 'runs' limits a stroke test to the segment runs starting at those
+        # segment numbers (the ones the shape grid found near the point)
         shape_type = shape["type"]
 
         if shape_type == "stroke":
@@ -295,9 +479,12 @@ class PaintApp:
             thresh = max(6, int(shape["width"]) + 3)
             if len(pts) == 1:
                 return math.hypot(pt[0] - pts[0][0], pt[1] - pts[0][1]) <= thresh
-            for i in range(len(pts) - 1):
-                if self.seg_dist(pt, pts[i], pts[i + 1]) <= thresh:
-                    return True
+            if runs is None:
+                runs = range(0, len(pts) - 1, STROKE_RUN)
+            for start in runs:
+                for i in range(start, min(start + STROKE_RUN, len(pts) - 1)):
+                    if self.seg_dist(pt, pts[i], pts[i + 1]) <= thresh:
+                        return True
             return False
 
         if shape_type == "line":
@@ -312,26 +499,210 @@ class PaintApp:
 
         return False
 
+    def hit_boxes(self, shape):
+        # (part, Rect) boxes that hold every point shape_hit() accepts,
+        # for the shape grid. Stroke parts are the first segment of a run.
+        shape_type = shape["type"]
+
+        if shape_type == "stroke":
+            pts = list(shape["points"])
+            pad = 2 * max(6, int(shape["width"]) + 3) + 2
+            if len(pts) == 1:
+                return [(0, self.points_bbox(pts).inflate(pad, pad))]
+            return [(i, self.points_bbox(pts[i:i + STROKE_RUN + 1]).inflate(pad, pad))
+                    for i in range(0, len(pts) - 1, STROKE_RUN)]
+
+        if shape_type == "line":
+            pad = 2 * max(6, int(shape["width"]) + 3) + 2
+            return [(0, self.points_bbox([shape["p1"], shape["p2"]]).inflate(pad, pad))]
+
+        if shape_type in ("rectangle", "circle", "square"):
+            return [(0, pygame.Rect(shape["rect"]).inflate(8, 8))]
+
+        return [(0, self.points_bbox(list(shape["points"])).inflate(8, 8))]
+
     def save_canvas(self):
+        # Hand a copy of the canvas to the saver thread; the toolbar message
+        # changes to "Saved" when its SAVE_DONE event arrives
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        save_dir = Path(__file__).resolve().parent
-        filename = str(save_dir / f"screens\canvas_{timestamp}.png")
-        pygame.image.save(self.canvas, filename)
-        # Show a brief confirmation message in the toolbar
-        self.save_message = (f"Saved: canvas_{timestamp}.png", pygame.time.get_ticks())
+        filename = f"canvas_{timestamp}.png"
+        self.saver.save(self.canvas, SCREENS_DIR / filename)
+        self.save_message = (f"Saving {filename}...", pygame.time.get_ticks())
+
+    def item_lists(self):
+        # Every item list with its record kind in project files
+        return [(ADD_SHAPE, self.shapes), (ADD_ERASE, self.erase_strokes),
+                (ADD_FILL, self.fills), (ADD_TEXT, self.texts)]
+
+    def item_kind(self, items):
+        # Record kind of one of the item lists
+        for kind, kind_items in self.item_lists():
+            if kind_items is items:
+                return kind
+
+    def save_document(self):
+        # Append what changed since the last save to the project file, or
+        # write the whole file when it is new or mostly dead records
+        self.finish_loading()
+        path = self.document_path
+        live = self.doc_items
+        kept = ""
+        if live is None and path.exists():
+            # A project this session did not open (or could not fully read):
+            # never write over it, save next to it under a new name instead
+            kept = f" ({path.name} kept)"
+            path = self.unused_document_path()
+        try:
+            if live is None or not path.exists() or self.doc_records - live > live:
+                entries = []
+                for kind, kind_items in self.item_lists():
+                    entries.extend((item["seq"], kind, item) for item in kind_items)
+                entries.sort(key=lambda entry: entry[0])
+                self.doc_length = write_document(path, self.canvas.get_size(),
+                                                 (encode_item(kind, item) for _, kind, item in entries))
+                self.doc_records = self.doc_items = len(entries)
+                self.document_path = path
+                message = f"Project saved: {path.name}{kept}"
+            else:
+                added = [encode_item(*self.doc_added[seq]) for seq in sorted(self.doc_added)]
+                removed = [encode_delete(seq) for seq in sorted(self.doc_removed)]
+                self.doc_length = append_records(path, self.doc_length, removed + added)
+                self.doc_records += len(added) + len(removed)
+                self.doc_items += len(added) - len(removed)
+                message = f"Project saved: {path.name} (+{len(added)} -{len(removed)})"
+        except OSError as exc:
+            message = f"Save failed: {exc}"
+        else:
+            self.doc_added = {}
+            self.doc_removed = set()
+        self.save_message = (message, pygame.time.get_ticks())
+
+    def unused_document_path(self):
+        # drawing.pnt -> drawing_2.pnt, drawing_3.pnt, ... whichever is free
+        path = self.document_path
+        number = 2
+        while True:
+            candidate = path.with_name(f"{path.stem}_{number}{path.suffix}")
+            if not candidate.exists():
+                return candidate
+            number += 1
+
+    def open_document(self):
+        # Replace the drawing with the project file's. Only the record index
+        # is read here; load_step() decodes and draws the items, a slice of
+        # time per frame, so even a huge project shows up right away.
+        # Drawing work that is not in the project file yet would be lost,
+        # so that has to be saved (Ctrl+Shift+S) first.
+        unsaved = (self.doc_added or self.doc_removed or
+                   (self.doc_items is None and any(items for _, items in self.item_lists())))
+        if unsaved:
+            self.save_message = ("Open failed: save the drawing first (Ctrl+Shift+S)",
+                                 pygame.time.get_ticks())
+            return
+        try:
+            doc = read_document(self.document_path)
+        except (OSError, ValueError) as exc:
+            self.save_message = (f"Open failed: {exc}", pygame.time.get_ticks())
+            return
+        if doc["size"] != self.canvas.get_size():
+            # Items are stored in canvas pixels, they would not fit this canvas
+            width, height = doc["size"]
+            self.save_message = (f"Open failed: made on a {width}x{height} canvas",
+                                 pygame.time.get_ticks())
+            return
+
+        self.is_drawing = False
+        self.active_stroke = []
+        self.text_active = False
+        self.shapes = []
+        self.erase_strokes = []
+        self.fills = []
+        self.texts = []
+        self.shape_grid = ShapeGrid()
+        self.history = TileHistory(self.canvas)
+        self.checkpoints = {}
+        self.items_since_checkpoint = 0
+        self.next_seq = doc["next_seq"]
+        self.canvas.fill((255, 255, 255))
+        self.mark_canvas_dirty(self.canvas.get_rect())
+
+        self.doc_items = len(doc["seqs"])
+        self.doc_added = {}
+        self.doc_removed = set()
+        self.doc_records = doc["records"]
+        self.doc_length = doc["length"]
+
+        pending = doc["pending"]
+        self.loading = {
+            "pending": pending,
+            "done": 0,
+            # Checkpoints spread over the whole drawing
+            "every": max(CHECKPOINT_EVERY, len(pending) // MAX_CHECKPOINTS + 1),
+        }
+        self.load_step()
+
+    def load_step(self):
+        # Decode, index and draw opened items until this frame's slice of
+        # time is used up. The canvas is locked for editing until all are in.
+        loading = self.loading
+        pending = loading["pending"]
+        lists = dict(self.item_lists())
+        end = time.perf_counter() + LOAD_SLICE_MS / 1000
+        try:
+            while loading["done"] < len(pending) and time.perf_counter() < end:
+                kind, payload = pending[loading["done"]]
+                loading["done"] += 1
+                item = decode_item(kind, payload)
+                if kind == ADD_TEXT:
+                    item["image"] = self.text_font.render(item["text"], True, item["color"])
+                lists[kind].append(item)
+                if kind == ADD_SHAPE:
+                    self.shape_grid.add(item["seq"], item, self.hit_boxes(item))
+                self.draw_item(self.canvas, item)
+                if loading["done"] % loading["every"] == 0:
+                    self.checkpoints[item["seq"] + 1] = self.canvas.copy()
+        except ValueError as exc:
+            # Keep what was read before the damaged record
+            self.loading = None
+            self.doc_items = None
+            self.save_message = (f"Open failed: {exc}", pygame.time.get_ticks())
+            return
+        finally:
+            self.mark_canvas_dirty(self.canvas.get_rect())
+
+        done, total = loading["done"], len(pending)
+        name = self.document_path.name
+        if done == total:
+            self.loading = None
+            self.items_since_checkpoint = done % loading["every"]
+            message = f"Opened {name} ({total} items)"
+        else:
+            message = f"Opening {name}... {100 * done // total}%"
+        self.save_message = (message, pygame.time.get_ticks())
+
+    def finish_loading(self):
+        while self.loading:
+            self.load_step()
+
+    def handle_save_done(self, event):
+        # Show a brief confirmation (or the error) in the toolbar
+        if event.error:
+            self.save_message = (f"Save failed: {event.error}", pygame.time.get_ticks())
+        else:
+            self.save_message = (f"Saved: {event.path.name}", pygame.time.get_ticks())
 
     def commit_text(self):
         if not self.text_buffer or self.text_pos is None:
             return
-        # Store so it survives a rebuild
-        self.texts.append({
+        # Store so it survives a rebuild (with the rendered text, so a
+        # rebuild does not render it again) and draw it onto the canvas
+        rendered = self.text_font.render(self.text_buffer, True, self.current_color)
+        self.add_item(self.texts, {
             "pos": self.text_pos,
             "text": self.text_buffer,
             "color": self.current_color,
+            "image": rendered,
         })
-        # Draw immediately to canvas
-        rendered = self.text_font.render(self.text_buffer, True, self.current_color)
-        self.canvas.blit(rendered, self.text_pos)
 
     def handle_keydown(self, event):
         # --- Text mode: route all keys to text input -------------------------
@@ -360,8 +731,26 @@ class PaintApp:
             pygame.event.post(pygame.event.Event(pygame.QUIT))
 
         elif event.key == pygame.K_s and (mods & pygame.KMOD_CTRL):
-            # Ctrl+S → save canvas as PNG
-            self.save_canvas()
+            # Ctrl+S → save canvas as PNG, Ctrl+Shift+S → save the project
+            if mods & pygame.KMOD_SHIFT:
+                self.save_document()
+            else:
+                self.save_canvas()
+
+        elif event.key == pygame.K_o and (mods & pygame.KMOD_CTRL):
+            # Ctrl+O → open the project file
+            self.open_document()
+
+        elif event.key == pygame.K_z and (mods & pygame.KMOD_CTRL):
+            # Ctrl+Z → undo, Ctrl+Shift+Z → redo
+            if mods & pygame.KMOD_SHIFT:
+                self.redo()
+            else:
+                self.undo()
+
+        elif event.key == pygame.K_y and (mods & pygame.KMOD_CTRL):
+            # Ctrl+Y → redo
+            self.redo()
 
         elif event.key == pygame.K_1:
             self.brush_size_idx = 0   # small
@@ -390,17 +779,26 @@ class PaintApp:
                 self.brush_size_idx = idx
                 return
 
-        # Everything below only applies to the canvas area
+        # Everything below only applies to the canvas area, which is
+        # locked while a project is being opened
         canvas_pos = self.get_canvas_pos(pos)
-        if canvas_pos is None:
+        if canvas_pos is None or self.loading:
             return
 
         # --- Fill tool: flood fill on click ----------------------------------
         if self.current_tool == "fill":
-            # Store the fill so it survives rebuild_canvas()
-            self.fills.append({"pos": canvas_pos, "color": self.current_color})
-            # Apply immediately to canvas
-            flood_fill(self.canvas, canvas_pos, self.current_color)
+            spans = fill_spans(self.canvas, canvas_pos, self.current_color)
+            if not spans:
+                return
+            # Store the filled pixels so the fill survives rebuild_canvas(),
+            # and stamp them onto the canvas
+            rect = spans_rect(spans)
+            self.add_item(self.fills, {
+                "pos": canvas_pos,
+                "color": self.current_color,
+                "rect": rect,
+                "mask": spans_mask(spans, rect),
+            })
             return
 
         # --- Text tool: place the text cursor --------------------------------
@@ -432,13 +830,17 @@ class PaintApp:
 
     def handle_right_down(self, pos):
         canvas_pos = self.get_canvas_pos(pos)
-        if canvas_pos is None:
+        if canvas_pos is None or self.loading:
             return
-        # Search from newest to oldest shape
-        for i in range(len(self.shapes) - 1, -1, -1):
-            if self.shape_hit(canvas_pos, self.shapes[i]):
-                del self.shapes[i]
-                self.rebuild_canvas()
+        # Search from newest to oldest, only among shapes near the click
+        nearby = self.shape_grid.near(canvas_pos)
+        for seq in sorted(nearby, reverse=True):
+            shape = self.shape_grid.items[seq]
+            if self.shape_hit(canvas_pos, shape, nearby[seq]):
+                self.history.begin(self.item_bounds(shape))
+                self.unstore_item(self.shapes, shape)
+                self.rebuild_canvas(seq)
+                self.history.commit(("delete", self.shapes, shape))
                 return
 
     def handle_left_up(self, pos):
@@ -460,151 +862,154 @@ class PaintApp:
         sp = self.start_pos
 
         if tool == "pencil" and self.active_stroke:
-            self.shapes.append({
+            self.add_item(self.shapes, {
                 "type": "stroke",
                 "points": list(self.active_stroke),
                 "color": self.current_color,
                 "width": bs,
             })
-            self.rebuild_canvas()
 
         elif tool == "line":
-            self.shapes.append({
+            self.add_item(self.shapes, {
                 "type": "line",
                 "p1": sp,
                 "p2": end,
                 "color": self.current_color,
                 "width": bs,
             })
-            self.rebuild_canvas()
 
         elif tool == "eraser" and self.active_stroke:
             # Eraser is just a white stroke — stored separately from shapes
-            self.erase_strokes.append({
+            self.add_item(self.erase_strokes, {
                 "type": "stroke",
                 "points": list(self.active_stroke),
                 "color": (255, 255, 255),
                 "width": 22,  # fixed eraser thickness
             })
-            self.rebuild_canvas()
 
         elif tool == "rectangle":
             r = self.drag_rect(sp, end)
             if r.width > 0 and r.height > 0:
-                self.shapes.append({
+                self.add_item(self.shapes, {
                     "type": "rectangle",
                     "rect": r,
                     "color": self.current_color,
                     "width": bs,
                 })
-                self.rebuild_canvas()
 
         elif tool == "circle":
             r = self.drag_rect(sp, end)
             if r.width > 0 and r.height > 0:
-                self.shapes.append({
+                self.add_item(self.shapes, {
                     "type": "circle",
                     "rect": r,
                     "color": self.current_color,
                     "width": bs,
                 })
-                self.rebuild_canvas()
 
         elif tool == "square":
             r = self.square_rect(sp, end)
             if r:
-                self.shapes.append({
+                self.add_item(self.shapes, {
                     "type": "square",
                     "rect": r,
                     "color": self.current_color,
                     "width": bs,
                 })
-                self.rebuild_canvas()
 
         elif tool == "right_tri":
             pts = self.right_tri_points(sp, end)
             if pts:
-                self.shapes.append({
+                self.add_item(self.shapes, {
                     "type": "right_tri",
                     "points": pts,
                     "color": self.current_color,
                     "width": bs,
                 })
-                self.rebuild_canvas()
 
         elif tool == "eq_tri":
             pts = self.eq_tri_points(sp, end)
             if pts:
-                self.shapes.append({
+                self.add_item(self.shapes, {
                     "type": "eq_tri",
                     "points": pts,
                     "color": self.current_color,
                     "width": bs,
                 })
-                self.rebuild_canvas()
 
         elif tool == "rhombus":
             pts = self.rhombus_points(sp, end)
             if pts:
-                self.shapes.append({
+                self.add_item(self.shapes, {
                     "type": "rhombus",
                     "points": pts,
                     "color": self.current_color,
                     "width": bs,
                 })
-                self.rebuild_canvas()
+
+    def toolbar_state(self):
+        # Everything the toolbar shows; draw() redraws it when this changes
+        showing_save = (self.save_message is not None and
+                        pygame.time.get_ticks() - self.save_message[1] < SAVE_MESSAGE_MS)
+        return (self.current_tool, self.current_color, self.brush_size_idx,
+                self.text_active, self.text_buffer,
+                self.save_message if showing_save else None)
 
     def draw_toolbar(self):
+        # Draws onto self.toolbar_surface, which draw() puts on the screen
+        self.toolbar_surface.fill((0, 0, 0, 0))
         # Toolbar background
-        pygame.draw.rect(self.screen, (228, 230, 238), (0, 0, WINDOW_WIDTH, TOOLBAR_HEIGHT))
+        pygame.draw.rect(self.toolbar_surface, (228, 230, 238), (0, 0, WINDOW_WIDTH, TOOLBAR_HEIGHT))
         # Dividing line between toolbar and canvas
-        pygame.draw.line(self.screen, (155, 158, 175),
+        pygame.draw.line(self.toolbar_surface, (155, 158, 175),
                          (0, TOOLBAR_HEIGHT), (WINDOW_WIDTH, TOOLBAR_HEIGHT), 2)
 
         # Draw each tool button
         for name, rect in self.tool_buttons:
             is_active = (name == self.current_tool)
             fill_color = (75, 140, 255) if is_active else (205, 210, 222)
-            pygame.draw.rect(self.screen, fill_color, rect, border_radius=7)
-            pygame.draw.rect(self.screen, (90, 90, 105), rect, width=1, border_radius=7)
+            pygame.draw.rect(self.toolbar_surface, fill_color, rect, border_radius=7)
+            pygame.draw.rect(self.toolbar_surface, (90, 90, 105), rect, width=1, border_radius=7)
             label_color = (255, 255, 255) if is_active else (20, 20, 30)
             label = self.font.render(TOOL_LABELS[name], True, label_color)
-            self.screen.blit(label, label.get_rect(center=rect.center))
+            self.toolbar_surface.blit(label, label.get_rect(center=rect.center))
 
         # Draw each color swatch
         for color, rect in self.color_buttons:
-            pygame.draw.rect(self.screen, color, rect, border_radius=4)
+            pygame.draw.rect(self.toolbar_surface, color, rect, border_radius=4)
             # Highlight the currently selected color with a thicker border
             if color == self.current_color:
-                pygame.draw.rect(self.screen, (10, 10, 10), rect, width=3, border_radius=4)
+                pygame.draw.rect(self.toolbar_surface, (10, 10, 10), rect, width=3, border_radius=4)
             else:
-                pygame.draw.rect(self.screen, (90, 90, 100), rect, width=1, border_radius=4)
+                pygame.draw.rect(self.toolbar_surface, (90, 90, 100), rect, width=1, border_radius=4)
 
         # Draw each size button
         for idx, rect in self.size_buttons:
             is_active = (idx == self.brush_size_idx)
             fill_color = (75, 140, 255) if is_active else (205, 210, 222)
-            pygame.draw.rect(self.screen, fill_color, rect, border_radius=6)
-            pygame.draw.rect(self.screen, (90, 90, 105), rect, width=1, border_radius=6)
+            pygame.draw.rect(self.toolbar_surface, fill_color, rect, border_radius=6)
+            pygame.draw.rect(self.toolbar_surface, (90, 90, 105), rect, width=1, border_radius=6)
             label_color = (255, 255, 255) if is_active else (20, 20, 30)
             label = self.font.render(SIZE_LABELS[idx], True, label_color)
-            self.screen.blit(label, label.get_rect(center=rect.center))
+            self.toolbar_surface.blit(label, label.get_rect(center=rect.center))
 
         # Hint bar at the bottom of the toolbar
         if self.text_active:
             hint = f'TEXT MODE  typing: "{self.text_buffer}"  |  Enter = confirm   Esc = cancel'
         else:
-            hint = ("Drag = draw   |   Right-click = delete shape   |   "
-                    "1/2/3 = brush size   |   Ctrl+S = save PNG   |   Esc = quit")
+            hint = ("Drag = draw  |  Right-click = delete  |  1/2/3 = size  |  "
+                    "Ctrl+Z/Y = undo/redo  |  Ctrl+S = save PNG  |  "
+                    "Ctrl+Shift+S / Ctrl+O = save / open project  |  Esc = quit")
         hint_surf = self.hint_font.render(hint, True, (50, 50, 60))
-        self.screen.blit(hint_surf, (8, 118))
+        self.toolbar_surface.blit(hint_surf, (8, 118))
 
         # Save confirmation message — shown for 3 seconds
         if self.save_message:
             msg, ts = self.save_message
-            if pygame.time.get_ticks() - ts < 3000:
-                saved_surf = self.hint_font.render(msg, True, (20, 130, 20))
-                self.screen.blit(saved_surf, (750, 118))
+            if pygame.time.get_ticks() - ts < SAVE_MESSAGE_MS:
+                msg_color = (190, 30, 30) if "failed" in msg else (20, 130, 20)
+                saved_surf = self.hint_font.render(msg, True, msg_color)
+                self.toolbar_surface.blit(saved_surf, (750, 96))
             else:
                 self.save_message = None
 
@@ -686,6 +1091,31 @@ class PaintApp:
                 shifted = [(x, y + TOOLBAR_HEIGHT) for x, y in pts]
                 pygame.draw.polygon(self.screen, col, shifted, width=max(1, bs))
 
+    def preview_rect(self):
+        # Screen area draw_preview() paints this frame, or None
+        if self.text_active and self.text_pos is not None:
+            w, h = self.text_font.size(self.text_buffer + "|")
+            return pygame.Rect(self.text_pos[0], self.text_pos[1] + TOOLBAR_HEIGHT, w, h)
+
+        if not self.is_drawing or self.start_pos is None or self.current_pos is None:
+            return None
+
+        if self.current_tool in ("pencil", "eraser"):
+            # Only the newest segment (and the joint before it) changes; the
+            # rest of the stroke is already on screen from the frames before
+            width = 22 if self.current_tool == "eraser" else self.brush_size()
+            rect = self.points_bbox(self.active_stroke[-3:])
+        else:
+            width = self.brush_size()
+            rect = self.points_bbox([self.start_pos, self.current_pos])
+        pad = 2 * width + 4
+        return rect.inflate(pad, pad).move(0, TOOLBAR_HEIGHT)
+
+    def cursor_rect(self):
+        # Screen area that holds any of the cursors drawn by draw_cursor()
+        mx, my = pygame.mouse.get_pos()
+        return pygame.Rect(mx - 26, my - 26, 52, 52)
+
     def draw_cursor(self):
         mx, my = pygame.mouse.get_pos()
 
@@ -715,25 +1145,79 @@ class PaintApp:
             pygame.draw.line(self.screen, (30, 30, 30), (mx, my - 8), (mx, my + 8), 1)
 
     def draw(self):
-        # Background behind the canvas
-        self.screen.fill((220, 222, 228))
-        # Canvas goes below the toolbar
-        self.screen.blit(self.canvas, (0, TOOLBAR_HEIGHT))
-        self.draw_toolbar()
+        # Redraws only the changed parts of the window and returns their
+        # rectangles for pygame.display.update()
+        state = self.toolbar_state()
+        if state != self.toolbar_drawn:
+            self.toolbar_drawn = state
+            self.draw_toolbar()
+            self.dirty.append(self.toolbar_surface.get_rect())
+
+        # The cursor and the preview are erased where they were last frame
+        # and drawn where they are now
+        cursor = self.cursor_rect()
+        preview = self.preview_rect()
+        rects = self.dirty + [r for r in (self.last_cursor, self.last_preview, cursor, preview) if r]
+        self.dirty = []
+        self.last_cursor, self.last_preview = cursor, preview
+
+        # A pencil preview is only redrawn around its newest segment, so when
+        # the preview goes away everything it ever covered is redrawn
+        if preview:
+            self.preview_area = preview.union(self.preview_area or preview)
+        elif self.preview_area:
+            rects.append(self.preview_area)
+            self.preview_area = None
+
+        for rect in rects:
+            # The clip keeps the blits' pixel work inside this rectangle
+            self.screen.set_clip(rect)
+            self.screen.blit(self.canvas, (0, TOOLBAR_HEIGHT))
+            self.screen.blit(self.toolbar_surface, (0, 0))
+        self.screen.set_clip(None)
+
+        # Drawn unclipped: pygame rasterizes clipped thick lines slightly
+        # differently. Both lie inside rects, which go to the display.
         self.draw_preview()
         self.draw_cursor()
+        return rects
+
+    def idle_timeout(self):
+        # How long the loop may sleep waiting for input: until the save
+        # message has to disappear, or for as long as it takes (0)
+        # (timed from the message last drawn; draw_toolbar() may already
+        # have cleared self.save_message)
+        shown = self.toolbar_drawn[-1] if self.toolbar_drawn else None
+        if shown:
+            shown_for = pygame.time.get_ticks() - shown[1]
+            return max(1, SAVE_MESSAGE_MS - shown_for)
+        return 0
 
     def run(self):
         running = True
 
         while running:
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            if not events and not self.dirty and not self.loading:
+                # Idle: nothing changes until the next event, so sleep
+                # until one arrives instead of redrawing 60 times a second
+                event = pygame.event.wait(self.idle_timeout())
+                events = [] if event.type == pygame.NOEVENT else [event]
+
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
 
+                elif event.type == pygame.VIDEOEXPOSE:
+                    # The window was covered and needs a full redraw
+                    self.dirty.append(self.screen.get_rect())
+
                 elif event.type == pygame.KEYDOWN:
                     self.handle_keydown(event)
 
+                elif event.type == SAVE_DONE:
+                    self.handle_save_done(event)
+
                 elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     self.handle_left_down(event.pos)
 
@@ -746,15 +1230,18 @@ class PaintApp:
                 elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
                     self.handle_left_up(event.pos)
 
-            self.draw()
-            pygame.display.flip()
+            if self.loading:
+                self.load_step()
+            pygame.display.update(self.draw())
             self.clock.tick(60)
 
+        # Let saves that are still being written finish
+        self.saver.close()
         pygame.mouse.set_visible(True)
         pygame.quit()
 
 
 # Entry point
 if __name__ == "__main__":
-    app = PaintApp()
+    app = PaintApp(sys.argv[1] if len(sys.argv) > 1 else None)
     app.run()
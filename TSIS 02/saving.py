@@ -0,0 +1,80 @@
+import os
+import queue
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+import pygame
+
+# Saving the canvas as PNG without freezing the window.
+# The UI thread only copies the canvas pixels; a worker thread compresses
+# them into a PNG, writes it to a temp file and renames it into place, so
+# a crash never leaves half a picture behind. When a file is done, the
+# worker posts a SAVE_DONE event (with .path and .error) to the event queue.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+DEFAULT_COMPRESSION = 6   # zlib level: 0 = fastest, 9 = smallest file
+
+SAVE_DONE = pygame.event.custom_type()
+
+
+# One PNG chunk: length, type, data, CRC of type + data
+def png_chunk(kind, data):
+    return (struct.pack(">I", len(data)) + kind + data +
+            struct.pack(">I", zlib.crc32(kind + data)))
+
+
+# 8-bit RGB PNG from raw RGB bytes (as given by pygame.image.tobytes)
+def encode_png(rgb, width, height, level=DEFAULT_COMPRESSION):
+    stride = width * 3
+    view = memoryview(rgb)
+    # Every row starts with its filter type; 0 = stored as is
+    raw = b"".join(b"\x00" + view[y * stride:(y + 1) * stride] for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE + png_chunk(b"IHDR", header) +
+            png_chunk(b"IDAT", zlib.compress(raw, level)) + png_chunk(b"IEND", b""))
+
+
+# Write to a hidden temp file next to 'path', then rename it over 'path'
+def write_atomic(path, data):
+    tmp = path.with_name(f".{path.name}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class BackgroundSaver:
+    def __init__(self, level=DEFAULT_COMPRESSION):
+        self.level = level
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="paint-saver", daemon=True)
+        self.thread.start()
+
+    # Copies the surface's pixels now, so drawing that happens while the
+    # file is written does not end up in it, and returns right away
+    def save(self, surface, path):
+        rgb = pygame.image.tobytes(surface, "RGB")
+        self.jobs.put((rgb, surface.get_size(), Path(path)))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            rgb, (width, height), path = job
+            error = None
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, encode_png(rgb, width, height, self.level))
+            except OSError as exc:
+                error = str(exc)
+            pygame.event.post(pygame.event.Event(SAVE_DONE, path=path, error=error))
+
+    # Finish the saves still queued (waiting at most 'timeout' seconds)
+    def close(self, timeout=10.0):
+        self.jobs.put(None)
+        self.thread.join(timeout)
@@ -1,48 +1,176 @@
 import pygame
-from collections import deque
 
 # Three brush size options the user can switch between
 BRUSH_SIZES = [2, 5, 10]
 
 
-# Flood fill using BFS — starts at 'start' pixel and fills all
-# connected pixels that match the original color with 'fill_color'
-def flood_fill(surface, start, fill_color):
+# Byte values used in the "pixel matches the clicked color" buffer below
+MATCH = b"\x01"
+NO_MATCH = b"\x00"
+
+
+# One byte per pixel, row by row: 1 where the pixel is within
+# 'tolerance' of 'color' (on every RGB channel), 0 elsewhere.
+# Built entirely by pygame's C code, no Python loop over pixels.
+def matching_pixels(surface, color, tolerance=0):
+    threshold = (tolerance + 1, tolerance + 1, tolerance + 1, 255)
+    mask = pygame.mask.from_threshold(surface, color, threshold)
+    flags = mask.to_surface(setcolor=(1, 1, 1), unsetcolor=(0, 0, 0))
+    return bytearray(pygame.image.tobytes(flags, "RGB")[::3])
+
+
+# Scanline flood fill search — finds all pixels connected to 'start'
+# (up/down/left/right) whose color is within 'tolerance' of the clicked
+# color, and returns them as horizontal runs (x_start, x_end, y), x_end
+# exclusive. Returns an empty list if there is nothing to fill.
+# Works on whole horizontal runs: bytes.find/rfind locate where a run ends,
+# so Python loops once per run instead of once per pixel. Rows are only
+# compared to the clicked color when the fill reaches them, so a small fill
+# stays cheap on a big canvas.
+def fill_spans(surface, start, fill_color, tolerance=0):
     x0, y0 = start
     w, h = surface.get_size()
 
     # Make sure the click is inside the canvas
     if not (0 <= x0 < w and 0 <= y0 < h):
-        return
+        return []
 
     # Remember the color we want to replace
     target_color = tuple(surface.get_at((x0, y0))[:3])
     new_color = tuple(fill_color[:3])
 
     # No work needed if the area is already the right color
-    if target_color == new_color:
-        return
-
-    # 2D grid to track which pixels we already visited
-    visited = [[False] * w for _ in range(h)]
+    if target_color == new_color and tolerance == 0:
+        return []
 
-    # BFS queue starts at the clicked pixel
-    queue = deque()
-    queue.append((x0, y0))
-    visited[y0][x0] = True
+    # Matching pixels still to fill, one buffer per row, made when the fill
+    # first reaches that row (no buffer for the whole canvas). Filled runs
+    # are zeroed, so the buffers also tell which pixels were already visited.
+    rows = [None] * h
+    zeros = memoryview(bytes(w))
 
-    while queue:
-        x, y = queue.popleft()
+    def row_match(y):
+        match = rows[y]
+        if match is None:
+            match = matching_pixels(surface.subsurface((0, y, w, 1)), target_color, tolerance)
+            rows[y] = match
+        return match
 
-        # Skip if this pixel changed color (hit a boundary)
-        if tuple(surface.get_at((x, y))[:3]) != target_color:
+    spans = []                 # (x_start, x_end, y) runs to paint
+    stack = [(x0, y0)]
+    while stack:
+        x, y = stack.pop()
+        match = row_match(y)
+        if not match[x]:
             continue
 
-        # Paint this pixel
-        surface.set_at((x, y), new_color)
+        # Grow the run left and right until a non-matching pixel
+        left = match.rfind(NO_MATCH, 0, x) + 1
+        right = match.find(NO_MATCH, x)
+        if right < 0:
+            right = w
+
+        match[left:right] = zeros[:right - left]
+        spans.append((left, right, y))
+
+        # Seed one point per matching run in the rows above and below
+        for ny in (y - 1, y + 1):
+            if not 0 <= ny < h:
+                continue
+            near = row_match(ny)
+            i = left
+            while i < right:
+                i = near.find(MATCH, i, right)
+                if i < 0:
+                    break
+                stack.append((i, ny))
+                i = near.find(NO_MATCH, i, right)
+                if i < 0:
+                    break
+
+    return spans
+
+
+# Paints the runs from fill_spans() through a locked PixelArray,
+# one slice assignment per run
+def paint_spans(surface, spans, color):
+    mapped = surface.map_rgb(tuple(color[:3]))
+    with pygame.PixelArray(surface) as pixels:
+        for x_start, x_end, y in spans:
+            pixels[x_start:x_end, y] = mapped
+
+
+# Smallest Rect that covers all the runs
+def spans_rect(spans):
+    min_x = min(span[0] for span in spans)
+    max_x = max(span[1] for span in spans)
+    min_y = min(span[2] for span in spans)
+    max_y = max(span[2] for span in spans)
+    return pygame.Rect(min_x, min_y, max_x - min_x, max_y - min_y + 1)
+
+
+# The runs as a pygame.Mask the size of spans_rect(spans), so a fill can be
+# kept as a 1-bit-per-pixel picture and stamped again without searching
+def spans_mask(spans, rect):
+    scratch = pygame.Surface(rect.size)
+    scratch.fill((0, 0, 0))
+    paint_spans(scratch, [(a - rect.x, b - rect.x, y - rect.y) for a, b, y in spans],
+                (255, 255, 255))
+    return pygame.mask.from_threshold(scratch, (255, 255, 255), (1, 1, 1, 255))
+
+
+# Flood fill — fills the area around 'start' with 'fill_color'.
+# Returns the Rect that was changed, or None if nothing changed.
+def flood_fill(surface, start, fill_color, tolerance=0):
+    spans = fill_spans(surface, start, fill_color, tolerance)
+    if not spans:
+        return None
+    paint_spans(surface, spans, fill_color)
+    return spans_rect(spans)
+
+
+# Size in pixels of one ShapeGrid cell
+GRID_CELL = 64
+
+
+# Uniform grid over the canvas for finding shapes near a point.
+# Every shape is added with the boxes of its parts: one box per run of a
+# few stroke segments, or one box for the whole outline of other shapes.
+# Each grid cell remembers which (shape key, part number) boxes overlap it,
+# so a hit test only looks at the shapes - and stroke segments - in the
+# cell under the mouse instead of every point of every stroke.
+class ShapeGrid:
+    def __init__(self, cell_size=GRID_CELL):
+        self.cell_size = cell_size
+        self.cells = {}     # (col, row) -> {key: [part, ...]}
+        self.cells_of = {}  # key -> set of (col, row) the shape is in
+        self.items = {}     # key -> shape
+
+    # Grid cells covered by a rectangle
+    def cells_for(self, rect):
+        size = self.cell_size
+        for col in range(rect.left // size, rect.right // size + 1):
+            for row in range(rect.top // size, rect.bottom // size + 1):
+                yield col, row
+
+    # Add a shape; 'boxes' is a list of (part, pygame.Rect)
+    def add(self, key, shape, boxes):
+        self.items[key] = shape
+        used = self.cells_of.setdefault(key, set())
+        for part, rect in boxes:
+            for cell in self.cells_for(rect):
+                self.cells.setdefault(cell, {}).setdefault(key, []).append(part)
+                used.add(cell)
+
+    def remove(self, key):
+        self.items.pop(key, None)
+        for cell in self.cells_of.pop(key, ()):
+            bucket = self.cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self.cells[cell]
 
-        # Check all 4 neighbours
-        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
-            if 0 <= nx < w and 0 <= ny < h and not visited[ny][nx]:
-                visited[ny][nx] = True
-                queue.append((nx, ny))
+    # {key: [part, ...]} of the shapes whose boxes cover the point's cell
+    def near(self, point):
+        size = self.cell_size
+        return self.cells.get((point[0] // size, point[1] // size), {})
@@ -0,0 +1,198 @@
+import heapq
+from array import array
+from collections import deque
+
+from config import GRID_COLS, GRID_ROWS
+from sim import is_opposite
+
+# Bot player for long, board-filling games (load tests and benchmarks).
+#
+# Each move: A* from the head to the food; the path is taken only if, after
+# following it, the head can still reach the tail (so the snake can always
+# escape by chasing it). Otherwise the snake follows a Hamiltonian cycle over
+# the board, and when obstacles break that, the move with the most room.
+#
+# Cells are flat indexes (y * cols + x). All search buffers are allocated once
+# and "cleared" by bumping a stamp, so a move costs no allocation per cell.
+
+
+class Autopilot:
+    def __init__(self, cols=GRID_COLS, rows=GRID_ROWS):
+        self.cols  = cols
+        self.rows  = rows
+        self.steps = (1, -1, cols, -cols)
+        self.dirs  = {1: (1, 0), -1: (-1, 0), cols: (0, 1), -cols: (0, -1)}
+
+        n = cols * rows
+        self.wall    = bytearray(n)
+        for x in range(cols):
+            for y in range(rows):
+                if x in (0, cols - 1) or y in (0, rows - 1):
+                    self.wall[y * cols + x] = 1
+        self.blocked = array("I", [0]) * n   # cell blocked when == block_stamp
+        self.seen    = array("I", [0]) * n   # cell visited when == seen_stamp
+        self.g       = array("i", [0]) * n   # A* cost so far
+        self.parent  = array("i", [0]) * n
+        self.block_stamp = 0
+        self.seen_stamp  = 0
+
+        self.cycle_next = self._build_cycle()
+
+    def _cell(self, pos):
+        return pos[1] * self.cols + pos[0]
+
+    # -------------------------------------------------------------------------
+    # Hamiltonian cycle over the interior
+    # -------------------------------------------------------------------------
+
+    def _build_cycle(self):
+        # Serpentine through columns 2.. row by row, then back up column 1.
+        # Needs an even number of interior rows (or columns, then transposed)
+        w, h = self.cols - 2, self.rows - 2
+        if h % 2 == 0:
+            order = [(0, 0)]
+            for r in range(h):
+                xs = range(1, w) if r % 2 == 0 else range(w - 1, 0, -1)
+                order.extend((x, r) for x in xs)
+            order.extend((0, r) for r in range(h - 1, 0, -1))
+        elif w % 2 == 0:
+            order = [(0, 0)]
+            for c in range(w):
+                ys = range(1, h) if c % 2 == 0 else range(h - 1, 0, -1)
+                order.extend((c, y) for y in ys)
+            order.extend((c, 0) for c in range(w - 1, 0, -1))
+        else:
+            return None   # odd x odd boards have no Hamiltonian cycle
+
+        nxt   = array("i", [-1]) * (self.cols * self.rows)
+        cells = [(y + 1) * self.cols + (x + 1) for x, y in order]
+        for i, cell in enumerate(cells):
+            nxt[cell] = cells[(i + 1) % len(cells)]
+        return nxt
+
+    # -------------------------------------------------------------------------
+    # Searches on the shared buffers
+    # -------------------------------------------------------------------------
+
+    def _mark_blocked(self, cells):
+        self.block_stamp += 1
+        stamp, blocked = self.block_stamp, self.blocked
+        for cell in cells:
+            blocked[cell] = stamp
+
+    def _free(self, cell):
+        return not self.wall[cell] and self.blocked[cell] != self.block_stamp
+
+    def _astar(self, start, goal):
+        self.seen_stamp += 1
+        stamp = self.seen_stamp
+        seen, g, parent = self.seen, self.g, self.parent
+        cols  = self.cols
+        gx, gy = goal % cols, goal // cols
+
+        seen[start], g[start], parent[start] = stamp, 0, -1
+        heap = [(abs(start % cols - gx) + abs(start // cols - gy), 0, start)]
+        while heap:
+            _, cost, cur = heapq.heappop(heap)
+            if cur == goal:
+                path = []
+                while cur != start:
+                    path.append(cur)
+                    cur = parent[cur]
+                path.reverse()
+                return path
+            if cost > g[cur]:
+                continue
+            for step in self.steps:
+                nb = cur + step
+                if not self._free(nb):
+                    continue
+                if seen[nb] != stamp or cost + 1 < g[nb]:
+                    seen[nb], g[nb], parent[nb] = stamp, cost + 1, cur
+                    h = abs(nb % cols - gx) + abs(nb // cols - gy)
+                    heapq.heappush(heap, (cost + 1 + h, cost + 1, nb))
+        return None
+
+    def _flood(self, start, goal=-1, limit=None):
+        # BFS from start: (goal reached, cells seen), stopping early at limit
+        self.seen_stamp += 1
+        stamp, seen = self.seen_stamp, self.seen
+        seen[start] = stamp
+        queue = deque([start])
+        count = 1
+        while queue:
+            cur = queue.popleft()
+            for step in self.steps:
+                nb = cur + step
+                if nb == goal:
+                    return True, count
+                if seen[nb] == stamp or not self._free(nb):
+                    continue
+                seen[nb] = stamp
+                count += 1
+                if limit is not None and count >= limit:
+                    return goal < 0, count
+                queue.append(nb)
+        return False, count
+
+    # -------------------------------------------------------------------------
+    # Decision
+    # -------------------------------------------------------------------------
+
+    def _safe_after(self, path, body, fixed):
+        # Body after walking the path and eating at its end (grows by one)
+        moved = path[::-1] + body[:max(0, len(body) - len(path) + 1)]
+        moved = moved[:len(body) + 1]
+        self._mark_blocked(moved[1:-1] + fixed)
+        return self._flood(moved[0], moved[-1])[0]
+
+    def decide(self, sim):
+        body  = [self._cell(pos) for pos in sim.snake]
+        head  = body[0]
+        tail  = body[-1]
+        fixed = [self._cell(pos) for pos in sim.obstacles]
+        if sim.poison:
+            fixed.append(self._cell(sim.poison["pos"]))
+        dx, dy = sim.direction
+        back  = head - (dy * self.cols + dx)   # the cell behind the head
+
+        # 1. Shortest path to the food, if the tail stays reachable afterwards.
+        # The tail is blocked too: the sim checks collisions before it moves
+        self._mark_blocked(body + fixed)
+        path = self._astar(head, self._cell(sim.food["pos"]))
+        if path and path[0] != back and self._safe_after(path, body, fixed):
+            return self.dirs[path[0] - head]
+
+        # 2. Next cell of the Hamiltonian cycle
+        self._mark_blocked(body + fixed)
+        if self.cycle_next is not None:
+            nxt = self.cycle_next[head]
+            if nxt >= 0 and nxt != back and self._free(nxt) and self._flood(nxt, tail)[0]:
+                return self.dirs[nxt - head]
+
+        # 3. The move that keeps the tail reachable and leaves the most room
+        best, best_key = None, None
+        for step in self.steps:
+            nb = head + step
+            if nb == back or not self._free(nb):
+                continue
+            reaches_tail, _ = self._flood(nb, tail)
+            _, room = self._flood(nb, limit=len(body) + 1)
+            key = (reaches_tail, room)
+            if best_key is None or key > best_key:
+                best, best_key = step, key
+        if best is None:
+            return None   # boxed in: keep going, the game is lost anyway
+        direction = self.dirs[best]
+        return None if is_opposite(direction, sim.direction) else direction
+
+
+_shared = None
+
+
+def autopilot_policy(sim, rng):
+    # headless.py policy; one Autopilot (and its buffers) serves every game
+    global _shared
+    if _shared is None:
+        _shared = Autopilot()
+    return _shared.decide(sim)
@@ -0,0 +1,347 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import (GRID_COLS, GRID_ROWS, BASE_SPEED, FOODS_PER_LEVEL,
+                    FOOD_LIFETIME_MS, OBSTACLE_COUNT)
+from sim import FOOD_KINDS
+
+# N Snake games advanced together with NumPy, for bot evaluation and rule
+# tuning over very many games (needs `pip install numpy`):
+#   python batch_env.py --games 1000000 --foods-per-level 5 --obstacles 6
+#
+# Same rules as sim.SnakeSim for movement, walls, self and obstacle
+# collisions, weighted food with a lifetime, levels, speed and obstacles from
+# level 3. Poison and power-ups are left out; use headless.py for those.
+#
+# The body is not stored as a list of cells: every board cell holds the tick
+# after which the snake leaves it (head = now + length), so the tail moves by
+# itself and "is this cell the snake?" is one array lookup for all games.
+
+DIRS     = np.array([(-1, 0), (1, 0), (0, -1), (0, 1)])   # same order as sim.DIRECTIONS
+OPPOSITE = np.array([1, 0, 3, 2])
+RIGHT    = 1
+
+DEATH_CAUSES = ["wall", "self", "obstacle", "timeout"]
+WALL, SELF, OBSTACLE, TIMEOUT = range(4)
+
+FOOD_WEIGHTS  = np.array([weight for weight, _ in FOOD_KINDS])
+SPAWN_RETRIES = 16   # random guesses before falling back to a full-board scan
+
+DEFAULT_PARAMS = {
+    "foods_per_level":  FOODS_PER_LEVEL,
+    "obstacle_count":   OBSTACLE_COUNT,
+    "base_speed":       BASE_SPEED,
+    "speed_step":       2,
+    "food_lifetime_ms": FOOD_LIFETIME_MS,
+}
+
+
+def make_walls():
+    walls = np.zeros((GRID_COLS, GRID_ROWS), dtype=bool)
+    walls[0, :] = walls[-1, :] = True
+    walls[:, 0] = walls[:, -1] = True
+    return walls
+
+
+class BatchSnakeEnv:
+    def __init__(self, n, seed=None, **params):
+        self.n      = n
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.rng    = np.random.default_rng(seed)
+        self.walls  = make_walls()
+        self.reset()
+
+    def reset(self):
+        n, p = self.n, self.params
+        self.t = 0   # shared tick counter, one per step()
+
+        # Boards indexed [game, x, y]
+        self.body      = np.zeros((n, GRID_COLS, GRID_ROWS), dtype=np.int32)
+        self.obstacles = np.zeros((n, GRID_COLS, GRID_ROWS), dtype=bool)
+
+        sx, sy = GRID_COLS // 2, GRID_ROWS // 2
+        self.hx     = np.full(n, sx)
+        self.hy     = np.full(n, sy)
+        self.body[:, sx, sy]     = 3
+        self.body[:, sx - 1, sy] = 2
+        self.body[:, sx - 2, sy] = 1
+        self.length    = np.full(n, 3)
+        self.direction = np.full(n, RIGHT)
+
+        self.score  = np.zeros(n, dtype=np.int64)
+        self.level  = np.ones(n, dtype=np.int64)
+        self.speed  = np.full(n, p["base_speed"])
+        self.now    = np.zeros(n, dtype=np.int64)   # simulated ms per game
+        self.steps  = np.zeros(n, dtype=np.int64)
+        self.alive  = np.ones(n, dtype=bool)
+        self.cause  = np.full(n, -1)
+
+        self.fx          = np.zeros(n, dtype=np.int64)
+        self.fy          = np.zeros(n, dtype=np.int64)
+        self.food_weight = np.zeros(n, dtype=np.int64)
+        self.food_spawn  = np.zeros(n, dtype=np.int64)
+        self._spawn_food(np.arange(n))
+
+    # -------------------------------------------------------------------------
+    # Cell picking
+    # -------------------------------------------------------------------------
+
+    def _cell_ok(self, idx, x, y, near_head):
+        ok = (~self.walls[x, y] & ~self.obstacles[idx, x, y]
+              & (self.body[idx, x, y] <= self.t)
+              & ~((x == self.fx[idx]) & (y == self.fy[idx])))
+        if near_head:
+            # Keep obstacles out of the diamond around the head so the snake
+            # always has room to turn
+            ok &= np.abs(x - self.hx[idx]) + np.abs(y - self.hy[idx]) > 2
+        return ok
+
+    def _pick_free_cells(self, idx, near_head=False):
+        # A random free cell per game: a few vectorized guesses, then an exact
+        # scan of the whole board for the (rare) games still without one
+        x = np.ones(len(idx), dtype=np.int64)
+        y = np.ones(len(idx), dtype=np.int64)
+        todo = np.arange(len(idx))
+        for _ in range(SPAWN_RETRIES):
+            if len(todo) == 0:
+                return x, y
+            gx = self.rng.integers(1, GRID_COLS - 1, len(todo))
+            gy = self.rng.integers(1, GRID_ROWS - 1, len(todo))
+            ok = self._cell_ok(idx[todo], gx, gy, near_head)
+            x[todo[ok]], y[todo[ok]] = gx[ok], gy[ok]
+            todo = todo[~ok]
+
+        for i in todo:
+            g  = idx[i]
+            xs, ys = np.nonzero(self._cell_ok(
+                np.full((GRID_COLS, GRID_ROWS), g),
+                np.arange(GRID_COLS)[:, None], np.arange(GRID_ROWS)[None, :], near_head))
+            if len(xs):   # a full board keeps (1, 1), as in sim.SnakeSim
+                k = self.rng.integers(len(xs))
+                x[i], y[i] = xs[k], ys[k]
+        return x, y
+
+    def _spawn_food(self, idx):
+        if len(idx) == 0:
+            return
+        self.fx[idx] = -1   # the old food cell is free for the new pick
+        self.fy[idx] = -1
+        self.fx[idx], self.fy[idx] = self._pick_free_cells(idx)
+        self.food_weight[idx] = self.rng.choice(FOOD_WEIGHTS, len(idx))
+        self.food_spawn[idx]  = self.now[idx]
+
+    def _place_obstacles(self, idx):
+        if len(idx) == 0:
+            return
+        self.obstacles[idx] = False
+        for _ in range(self.params["obstacle_count"]):
+            x, y = self._pick_free_cells(idx, near_head=True)
+            self.obstacles[idx, x, y] = True
+
+    # -------------------------------------------------------------------------
+    # One move for every live game
+    # -------------------------------------------------------------------------
+
+    def step(self, actions=None):
+        # actions: one index into DIRS per game, -1 keeps the current
+        # direction; reversals are ignored like in SnakeSim.step
+        idx = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return
+        p = self.params
+        self.t += 1
+        t = self.t
+
+        self.now[idx]   += 1000 // self.speed[idx]
+        self.steps[idx] += 1
+
+        expired = idx[self.now[idx] - self.food_spawn[idx] >= p["food_lifetime_ms"]]
+        self._spawn_food(expired)
+
+        if actions is not None:
+            a     = np.asarray(actions)[idx]
+            valid = (a >= 0) & (a != OPPOSITE[self.direction[idx]])
+            self.direction[idx[valid]] = a[valid]
+
+        d  = DIRS[self.direction[idx]]
+        nx = self.hx[idx] + d[:, 0]
+        ny = self.hy[idx] + d[:, 1]
+
+        # Collisions; the tail still counts, it leaves only after this move
+        hit_wall = self.walls[nx, ny]
+        hit_self = ~hit_wall & (self.body[idx, nx, ny] >= t)
+        hit_obs  = ~hit_wall & ~hit_self & self.obstacles[idx, nx, ny]
+        dead     = hit_wall | hit_self | hit_obs
+        self.cause[idx[hit_wall]] = WALL
+        self.cause[idx[hit_self]] = SELF
+        self.cause[idx[hit_obs]]  = OBSTACLE
+        self.alive[idx[dead]]     = False
+
+        movers, nx, ny = idx[~dead], nx[~dead], ny[~dead]
+        eat     = (nx == self.fx[movers]) & (ny == self.fy[movers])
+        eaters  = movers[eat]
+
+        # Growing = every body cell stays one tick longer
+        if len(eaters):
+            grown = self.body[eaters]
+            grown += grown >= t
+            self.body[eaters]    = grown
+            self.length[eaters] += 1
+
+        self.body[movers, nx, ny] = t + self.length[movers]
+        self.hx[movers], self.hy[movers] = nx, ny
+
+        if len(eaters):
+            self.score[eaters] += self.food_weight[eaters]
+            new_level = 1 + self.score[eaters] // p["foods_per_level"]
+            changed   = eaters[new_level != self.level[eaters]]
+            self.level[changed] = 1 + self.score[changed] // p["foods_per_level"]
+            self.speed[changed] = p["base_speed"] + (self.level[changed] - 1) * p["speed_step"]
+            self._place_obstacles(changed[self.level[changed] >= 3])
+            self._spawn_food(eaters)
+
+    # -------------------------------------------------------------------------
+    # What each direction leads to, for vectorized policies
+    # -------------------------------------------------------------------------
+
+    def next_cells(self):
+        nx = self.hx[:, None] + DIRS[None, :, 0]
+        ny = self.hy[:, None] + DIRS[None, :, 1]
+        return nx, ny
+
+    def safe_moves(self):
+        nx, ny = self.next_cells()
+        games  = np.arange(self.n)[:, None]
+        safe   = (~self.walls[nx, ny] & ~self.obstacles[games, nx, ny]
+                  & (self.body[games, nx, ny] <= self.t))
+        safe[np.arange(self.n), OPPOSITE[self.direction]] = False
+        return safe
+
+
+def random_policy(env, rng):
+    # Any safe direction
+    noise = rng.random((env.n, len(DIRS)))
+    return np.where(env.safe_moves(), noise, -1.0).argmax(axis=1)
+
+
+def greedy_policy(env, rng):
+    # Safe direction closest to the food, ties broken at random
+    nx, ny = env.next_cells()
+    dist   = np.abs(nx - env.fx[:, None]) + np.abs(ny - env.fy[:, None])
+    key    = dist + rng.random(dist.shape) * 0.5
+    return np.where(env.safe_moves(), key, np.inf).argmin(axis=1)
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+}
+
+
+# -----------------------------------------------------------------------------
+# Aggregation
+# -----------------------------------------------------------------------------
+
+def run_batch(n, seed, policy_name, max_steps, params):
+    # Play n games to the end and return histograms, so merging results
+    # from many batches stays cheap whatever the number of games
+    env    = BatchSnakeEnv(n, seed, **params)
+    policy = POLICIES[policy_name]
+    rng    = np.random.default_rng(seed)
+    while env.alive.any() and env.t < max_steps:
+        env.step(policy(env, rng))
+    env.cause[env.alive] = TIMEOUT
+
+    return {
+        "games":  n,
+        "steps":  int(env.steps.sum()),
+        "scores": np.bincount(env.score),
+        "levels": np.bincount(env.level),
+        "causes": np.bincount(env.cause, minlength=len(DEATH_CAUSES)),
+    }
+
+
+def _add_hist(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    a = a.copy()
+    a[:len(b)] += b
+    return a
+
+
+def merge_summaries(summaries):
+    total = {"games": 0, "steps": 0, "scores": np.zeros(1, np.int64),
+             "levels": np.zeros(1, np.int64), "causes": np.zeros(len(DEATH_CAUSES), np.int64)}
+    for s in summaries:
+        total["games"] += s["games"]
+        total["steps"] += s["steps"]
+        for key in ("scores", "levels", "causes"):
+            total[key] = _add_hist(total[key], s[key])
+    return total
+
+
+def hist_mean(hist):
+    return float((np.arange(len(hist)) * hist).sum() / max(1, hist.sum()))
+
+
+def hist_percentile(hist, q):
+    cum = np.cumsum(hist)
+    return int(np.searchsorted(cum, q / 100 * cum[-1]))
+
+
+def run_parallel(games, batch_size, workers, seed, policy_name, max_steps, params):
+    sizes = [min(batch_size, games - start) for start in range(0, games, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args  = [(size, s, policy_name, max_steps, params) for size, s in zip(sizes, seeds)]
+    if workers <= 1:
+        return merge_summaries(run_batch(*a) for a in args)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_summaries(pool.map(run_batch, *zip(*args)))
+
+
+def print_summary(total, elapsed):
+    scores, levels, causes = total["scores"], total["levels"], total["causes"]
+    print(f"{total['games']} games in {elapsed:.2f}s: {total['games'] / elapsed:.0f} games/s, "
+          f"{total['steps'] / elapsed:.0f} moves/s")
+    print(f"score  mean {hist_mean(scores):.2f}  median {hist_percentile(scores, 50)}  "
+          f"p90 {hist_percentile(scores, 90)}  max {len(scores) - 1}")
+    print(f"level  mean {hist_mean(levels):.2f}  max {len(levels) - 1}")
+    for level in range(1, len(levels)):
+        if levels[level]:
+            print(f"  level {level:2d}: {levels[level] / total['games']:6.1%}")
+    print("death  " + "  ".join(f"{name} {count / total['games']:.1%}"
+                                for name, count in zip(DEATH_CAUSES, causes)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched, vectorized Snake simulation")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=2000, help="Games per NumPy batch.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policy", choices=list(POLICIES), default="greedy")
+    parser.add_argument("--max-steps", type=int, default=5000, help="Stop games after this many moves.")
+    parser.add_argument("--foods-per-level", type=int, default=FOODS_PER_LEVEL)
+    parser.add_argument("--obstacles", type=int, default=OBSTACLE_COUNT, help="Obstacles per level from level 3.")
+    parser.add_argument("--base-speed", type=int, default=BASE_SPEED)
+    parser.add_argument("--speed-step", type=int, default=2, help="Speed added per level.")
+    args = parser.parse_args()
+
+    params = {
+        "foods_per_level": args.foods_per_level,
+        "obstacle_count":  args.obstacles,
+        "base_speed":      args.base_speed,
+        "speed_step":      args.speed_step,
+    }
+    start = time.perf_counter()
+    total = run_parallel(args.games, args.batch_size, args.workers, args.seed,
+                         args.policy, args.max_steps, params)
+    print_summary(total, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import time
+
+from autopilot import Autopilot
+
+# Frame time against snake length, with the autopilot playing as fast as it
+# can. Windowed by default; --dummy renders offscreen (no display needed) and
+# --no-render times only the simulation and the autopilot:
+#   python bench_frames.py --games 3 --dummy
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+def run(games, seed, render, max_ticks):
+    # Returns {length bucket: [(logic_ms, draw_ms), ...]}
+    import pygame
+    from config import load_settings, WINDOW_WIDTH, WINDOW_HEIGHT
+    from game import SnakeGame
+
+    pygame.init()
+    screen  = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pilot   = Autopilot()
+    buckets = {}
+    for i in range(games):
+        game = SnakeGame(screen, load_settings(), "bench", 0, False, seed=seed + i, autopilot=pilot)
+        while not game.sim.game_over and game.sim.ticks < max_ticks:
+            pygame.event.pump()
+            t0 = time.perf_counter()
+            game.update()
+            t1 = time.perf_counter()
+            if render:
+                game.draw()
+                pygame.display.flip()
+            t2 = time.perf_counter()
+            bucket = len(game.sim.snake) // 25 * 25
+            buckets.setdefault(bucket, []).append(((t1 - t0) * 1000, (t2 - t1) * 1000))
+    pygame.quit()
+    return buckets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snake frame time vs snake length")
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-ticks", type=int, default=20000)
+    parser.add_argument("--dummy", action="store_true", help="Use SDL's offscreen video driver.")
+    parser.add_argument("--no-render", action="store_true", help="Time logic only.")
+    args = parser.parse_args()
+
+    if args.dummy or args.no_render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    buckets = run(args.games, args.seed, not args.no_render, args.max_ticks)
+
+    print(f"{'length':>9}  {'frames':>6}  {'logic ms':>8}  {'draw ms':>8}  {'p95 frame':>9}")
+    for bucket in sorted(buckets):
+        rows   = buckets[bucket]
+        logic  = statistics.mean(r[0] for r in rows)
+        draw   = statistics.mean(r[1] for r in rows)
+        p95    = percentile([r[0] + r[1] for r in rows], 95)
+        print(f"{bucket:4d}-{bucket + 24:<4d}  {len(rows):6d}  {logic:8.3f}  {draw:8.3f}  {p95:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
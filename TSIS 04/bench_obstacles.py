@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+
+from sim import FreeCells, MIN_REACHABLE_CELLS, place_obstacles, reachable_cells
+
+# Times obstacle placement on large boards, old algorithm against the current
+# one, and checks every placement leaves the head enough room:
+#   python bench_obstacles.py --sizes 24 100 300 --density 0.1
+
+
+def legacy_place_obstacles(rng, cols, rows, head, snake_cells, count):
+    # The original version: list-backed BFS queue, blocked set rebuilt for
+    # every candidate and a linear candidates.remove()
+    def trapped(obstacles):
+        blocked = set(obstacles) | snake_cells
+        visited = {head}
+        queue   = [head]
+        while queue:
+            if len(visited) >= MIN_REACHABLE_CELLS:
+                return False
+            x, y = queue.pop(0)
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                nb = (x + dx, y + dy)
+                if (nb not in blocked and nb not in visited
+                        and 0 < nb[0] < cols - 1 and 0 < nb[1] < rows - 1):
+                    visited.add(nb)
+                    queue.append(nb)
+        return len(visited) < MIN_REACHABLE_CELLS
+
+    candidates = [(x, y) for x in range(1, cols - 1) for y in range(1, rows - 1)
+                  if (x, y) not in snake_cells]
+    obs = set()
+    for _ in range(count):
+        if not candidates:
+            break
+        cell = rng.choice(candidates)
+        if not trapped(obs | {cell}):
+            obs.add(cell)
+            candidates.remove(cell)
+    return obs
+
+
+def make_board(size):
+    cx, cy = size // 2, size // 2
+    snake  = {(cx - i, cy) for i in range(3)}
+    return (cx, cy), snake
+
+
+def time_new(size, count, seed):
+    rng = random.Random(seed)
+    head, snake = make_board(size)
+    free = FreeCells(size, size)
+    for cell in snake:
+        free.remove(cell)
+    start = time.perf_counter()
+    obstacles = place_obstacles(rng, free, head, snake, count)
+    elapsed = time.perf_counter() - start
+    region = reachable_cells(head, obstacles, snake, MIN_REACHABLE_CELLS, size, size)
+    assert len(region) >= MIN_REACHABLE_CELLS, "head trapped"
+    assert not obstacles & snake, "obstacle on the snake"
+    return elapsed, len(obstacles)
+
+
+def time_legacy(size, count, seed):
+    rng = random.Random(seed)
+    head, snake = make_board(size)
+    start = time.perf_counter()
+    obstacles = legacy_place_obstacles(rng, size, size, head, snake, count)
+    return time.perf_counter() - start, len(obstacles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Obstacle placement benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[24, 100, 300])
+    parser.add_argument("--density", type=float, default=0.1, help="Obstacles as a share of the board.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-legacy-above", type=int, default=150,
+                        help="Do not time the old algorithm on bigger boards (too slow).")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        count = max(1, int((size - 2) ** 2 * args.density))
+        new_s, placed = time_new(size, count, args.seed)
+        line = f"{size}x{size}, {count} obstacles: new {new_s * 1000:8.1f} ms ({placed} placed)"
+        if size <= args.skip_legacy_above:
+            old_s, old_placed = time_legacy(size, count, args.seed)
+            line += f" | old {old_s * 1000:9.1f} ms ({old_placed} placed), x{old_s / new_s:.0f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,14 @@ POWERUP_LIFETIME_MS  = 8000   # field lifetime before disappearing
 POWERUP_EFFECT_MS    = 5000   # duration of speed boost / slow motion
 OBSTACLE_COUNT       = 3      # blocks added per level from level 3
 
+RENDER_FPS           = 60     # frames per second; game logic ticks at the snake's speed
+MAX_FRAME_MS         = 250    # longer frames are clamped so a stall can't flood ticks
+INPUT_BUFFER_SIZE    = 3      # turns queued between two logic ticks
+
 SETTINGS_FILE = Path(__file__).parent / "settings.json"
+JOURNAL_FILE  = Path(__file__).parent / "results_journal.jsonl"   # results saved while DB is down
+REJECT_FILE   = Path(__file__).parent / "results_rejected.jsonl"  # results the DB refused
+REPLAY_DIR    = Path(__file__).parent / "replays"                 # <client_id>.snr per game
 
 DEFAULT_SETTINGS = {
     "snake_color": [45, 185, 70],
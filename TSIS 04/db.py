@@ -1,4 +1,16 @@
+import functools
+import json
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from config import JOURNAL_FILE, REJECT_FILE
 
 DB_CONFIG = {
     "host":     "localhost",
@@ -9,11 +21,106 @@ DB_CONFIG = {
 }
 
 
+WRITER_QUEUE_SIZE = 256   # results waiting to be written before new ones are dropped
+WRITER_BATCH_SIZE = 50    # max sessions inserted in one transaction
+DB_RETRY_SECONDS  = 30    # while the DB is down, results go to the journal until the next retry
+CACHE_TTL_SECONDS = 10    # leaderboard / personal best snapshots older than this are stale
+CACHE_RETRY_SECONDS = 5   # min pause between refresh attempts of the same snapshot
+POOL_MAX_CONNECTIONS = 4  # UI thread + result writer + cache refresher + spare
+POOL_MIN_CONNECTIONS = 2  # idle connections kept open for reuse (the writer holds its own)
+
+# Errors that mean the connection itself is broken (server restart, network drop)
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_pool      = None
+_pool_lock = threading.Lock()
+
+_tables_ready = False            # create_tables() succeeded once in this process
+_tables_lock  = threading.Lock()
+
+
 def get_connection():
     return psycopg2.connect(**DB_CONFIG)
 
 
-def ensure_tables():
+def get_pool():
+    # Created on first use, which opens its first connections; while the DB is down
+    # this raises like any other query (callers catch it) and the next call tries again.
+    # The pool only keeps a returned connection while fewer than minconn are idle.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadedConnectionPool(POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **DB_CONFIG)
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+def checkout():
+    # A pooled connection that is still open
+    pool = get_pool()
+    conn = pool.getconn()
+    if conn.closed:
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    return conn
+
+
+def release(conn, broken=False):
+    # After close_pool() there is nothing to return to (closeall() closed the
+    # connection), and get_pool() would open a new pool during shutdown
+    pool = _pool
+    if pool is None:
+        return
+    pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+@contextmanager
+def pooled_connection():
+    # Commits on success, rolls back on error; broken connections are not reused
+    conn = checkout()
+    try:
+        yield conn
+        conn.commit()
+    except CONNECTION_ERRORS:
+        release(conn, broken=True)
+        raise
+    except Exception:
+        conn.rollback()
+        release(conn)
+        raise
+    release(conn)
+
+
+def retry_on_disconnect(func):
+    # A stale pooled connection fails on first use; try once more on a fresh one
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except CONNECTION_ERRORS:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def create_tables(conn):
+    # The DDL takes catalog and table locks, so it runs once per process: the
+    # writer reconnecting after an outage, or racing ensure_tables(), skips it
+    global _tables_ready
+    with _tables_lock:
+        if _tables_ready:
+            return
+        _run_ddl(conn)
+        _tables_ready = True
+
+
+def _run_ddl(conn):
     sql = """
     CREATE TABLE IF NOT EXISTS players (
         id       SERIAL PRIMARY KEY,
@@ -26,66 +133,438 @@ def ensure_tables():
         level_reached INTEGER   NOT NULL,
         played_at     TIMESTAMP DEFAULT NOW()
     );
+    -- client-generated id, so replaying the offline journal never inserts twice
+    ALTER TABLE game_sessions ADD COLUMN IF NOT EXISTS client_id UUID;
+    CREATE UNIQUE INDEX IF NOT EXISTS game_sessions_client_id_key
+        ON game_sessions (client_id);
+    CREATE INDEX IF NOT EXISTS game_sessions_player_score_idx
+        ON game_sessions (player_id, score DESC);
+
+    -- Best session per player, kept up to date by a trigger on game_sessions,
+    -- so the leaderboard and personal best never scan all sessions
+    CREATE TABLE IF NOT EXISTS player_best (
+        player_id     INTEGER PRIMARY KEY REFERENCES players(id),
+        best_score    INTEGER   NOT NULL,
+        level_reached INTEGER   NOT NULL,
+        played_at     TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS player_best_score_idx
+        ON player_best (best_score DESC);
+
+    CREATE OR REPLACE FUNCTION update_player_best() RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO player_best (player_id, best_score, level_reached, played_at)
+        SELECT DISTINCT ON (player_id) player_id, score, level_reached, played_at
+        FROM new_sessions
+        ORDER BY player_id, score DESC
+        ON CONFLICT (player_id) DO UPDATE
+            SET best_score    = EXCLUDED.best_score,
+                level_reached = EXCLUDED.level_reached,
+                played_at     = EXCLUDED.played_at
+            WHERE EXCLUDED.best_score > player_best.best_score;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'game_sessions_player_best') THEN
+            CREATE TRIGGER game_sessions_player_best
+            AFTER INSERT ON game_sessions
+            REFERENCING NEW TABLE AS new_sessions
+            FOR EACH STATEMENT EXECUTE FUNCTION update_player_best();
+        END IF;
+    END $$;
+
+    -- One-time backfill for sessions recorded before player_best existed
+    INSERT INTO player_best (player_id, best_score, level_reached, played_at)
+    SELECT DISTINCT ON (player_id) player_id, score, level_reached, played_at
+    FROM game_sessions
+    WHERE player_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM player_best)
+    ORDER BY player_id, score DESC;
     """
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql)
-        conn.commit()
+    with conn.cursor() as cur:
+        cur.execute(sql)
+    conn.commit()
 
 
+@retry_on_disconnect
+def ensure_tables():
+    with pooled_connection() as conn:
+        create_tables(conn)
+
+
+@retry_on_disconnect
 def get_or_create_player(username):
-    with get_connection() as conn:
+    with pooled_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute("SELECT id FROM players WHERE username = %s", (username,))
-            row = cur.fetchone()
-            if row:
-                return row[0]
-            cur.execute(
-                "INSERT INTO players (username) VALUES (%s) RETURNING id", (username,)
-            )
-            player_id = cur.fetchone()[0]
-        conn.commit()
-    return player_id
+            # DO UPDATE (a no-op change) returns the id even when the player
+            # already exists or was just created by another transaction
+            cur.execute("""
+                INSERT INTO players (username) VALUES (%s)
+                ON CONFLICT (username) DO UPDATE SET username = EXCLUDED.username
+                RETURNING id
+            """, (username,))
+            return cur.fetchone()[0]
 
 
-def save_result(username, score, level):
-    player_id = get_or_create_player(username)
-    with get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO game_sessions (player_id, score, level_reached) VALUES (%s, %s, %s)",
-                (player_id, score, level),
-            )
-        conn.commit()
+def save_result(username, score, level, client_id=None):
+    # The row, client_id included, is built once here, outside the retried part,
+    # so a retry after a dropped connection can never insert the game twice
+    row = (client_id or str(uuid.uuid4()), username, score, level, datetime.now())
+    _save_row(row)
+
 
+@retry_on_disconnect
+def _save_row(row):
+    # One round trip
+    with pooled_connection() as conn:
+        insert_results(conn, [row])
 
+
+@retry_on_disconnect
 def get_leaderboard():
     # Returns list of (username, best_score, level_reached, played_at) — one row per player
-    with get_connection() as conn:
+    with pooled_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT username, score, level_reached, day FROM (
-                    SELECT DISTINCT ON (p.id)
-                           p.username, s.score, s.level_reached,
-                           TO_CHAR(s.played_at, 'YYYY-MM-DD') AS day
-                    FROM game_sessions s
-                    JOIN players p ON s.player_id = p.id
-                    ORDER BY p.id, s.score DESC
-                ) best
-                ORDER BY score DESC
+                SELECT p.username, b.best_score, b.level_reached,
+                       TO_CHAR(b.played_at, 'YYYY-MM-DD') AS day
+                FROM player_best b
+                JOIN players p ON p.id = b.player_id
+                ORDER BY b.best_score DESC
                 LIMIT 10
             """)
             return cur.fetchall()
 
 
+@retry_on_disconnect
 def get_personal_best(username):
-    with get_connection() as conn:
+    with pooled_connection() as conn:
         with conn.cursor() as cur:
             cur.execute("""
-                SELECT MAX(s.score)
-                FROM game_sessions s
-                JOIN players p ON s.player_id = p.id
+                SELECT b.best_score
+                FROM player_best b
+                JOIN players p ON p.id = b.player_id
                 WHERE p.username = %s
             """, (username,))
             row = cur.fetchone()
     return row[0] if row and row[0] is not None else 0
+
+
+# -----------------------------------------------------------------------------
+# Write-behind result queue — the game loop never waits for the database
+# -----------------------------------------------------------------------------
+
+_STOP = object()
+
+
+def insert_results(conn, batch):
+    # batch: list of (client_id, username, score, level, played_at)
+    # One statement: create missing players and insert all sessions in a single round trip.
+    # DO UPDATE (a no-op change) makes RETURNING give every player of the batch, also
+    # one committed by another transaction after this statement's snapshot was taken,
+    # which a plain SELECT from players would miss (and the JOIN would drop its sessions).
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH r AS (
+                SELECT *
+                FROM UNNEST(%s::UUID[], %s::VARCHAR[], %s::INT[], %s::INT[], %s::TIMESTAMP[])
+                     AS r(client_id, username, score, level_reached, played_at)
+            ), batch_players AS (
+                INSERT INTO players (username)
+                SELECT DISTINCT username FROM r
+                ON CONFLICT (username) DO UPDATE SET username = EXCLUDED.username
+                RETURNING id, username
+            )
+            INSERT INTO game_sessions (client_id, player_id, score, level_reached, played_at)
+            SELECT r.client_id, p.id, r.score, r.level_reached, r.played_at
+            FROM r
+            JOIN batch_players p ON p.username = r.username
+            ON CONFLICT (client_id) DO NOTHING
+        """, (
+            [row[0] for row in batch],
+            [row[1] for row in batch],
+            [row[2] for row in batch],
+            [row[3] for row in batch],
+            [row[4] for row in batch],
+        ))
+    conn.commit()
+
+
+# Offline journal: one JSON object per line next to settings.json
+
+def journal_append(batch, path=JOURNAL_FILE):
+    with open(path, "a", encoding="utf-8") as f:
+        for client_id, username, score, level, played_at in batch:
+            f.write(json.dumps({
+                "client_id": client_id,
+                "username":  username,
+                "score":     score,
+                "level":     level,
+                "played_at": played_at.isoformat(),
+            }) + "\n")
+
+
+def journal_read(path=JOURNAL_FILE):
+    if not path.exists():
+        return []
+    rows = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+                rows.append((item["client_id"], item["username"], item["score"],
+                             item["level"], datetime.fromisoformat(item["played_at"])))
+            except (ValueError, KeyError):
+                continue   # half-written line from a crash
+    return rows
+
+
+def journal_clear(path=JOURNAL_FILE):
+    if path.exists():
+        path.unlink()
+
+
+class ResultWriter:
+    """Background thread that saves game results over one pooled connection it keeps.
+
+    While the database is unreachable, results are appended to the offline
+    journal; once it is back, the journal is replayed in multi-row batches.
+    """
+
+    def __init__(self, max_pending=WRITER_QUEUE_SIZE, batch_size=WRITER_BATCH_SIZE):
+        self.queue       = queue.Queue(maxsize=max_pending)
+        self.batch_size  = batch_size
+        self.conn        = None
+        self.retry_after = 0.0    # time.monotonic() before which the DB is not tried
+        self.has_journal = JOURNAL_FILE.exists()
+        self.journal_lock = threading.Lock()   # close() may append from the caller's thread
+        self.in_flight   = []     # rows taken off the queue and not saved yet
+        self.abandoned   = False  # set by close() once it gave up waiting: no more DB work
+        self.thread      = threading.Thread(target=self._run, name="snake-db-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, username, score, level, client_id=None):
+        # Returns immediately; False if the queue is full and the result was dropped
+        row = (client_id or str(uuid.uuid4()), username, score, level, datetime.now())
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            print("[DB] Result queue full, result not saved")
+            return False
+        return True
+
+    def close(self, timeout=3.0):
+        # Flush what is queued (waiting at most `timeout` seconds) and stop the thread.
+        # The thread is a daemon and dies with the process, so whatever it has not
+        # saved by then is journaled here; a row saved twice is skipped by client_id.
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        else:
+            self.thread.join(timeout)
+            if not self.thread.is_alive():
+                return
+
+        self.abandoned = True
+        leftover = list(self.in_flight)
+        while True:
+            try:
+                row = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if row is not _STOP:
+                leftover.append(row)
+        if leftover:
+            print(f"[DB] Database is slow, keeping {len(leftover)} result(s) offline")
+            self._journal(leftover)
+
+    def _run(self):
+        if self.has_journal:
+            self._replay_journal()
+
+        running = True
+        while running and not self.abandoned:
+            batch = self.in_flight = []
+            try:
+                # Wake up now and then to replay the journal when the DB comes back
+                batch.append(self.queue.get(timeout=DB_RETRY_SECONDS))
+            except queue.Empty:
+                pass
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if _STOP in batch:
+                running = False
+                batch.remove(_STOP)
+
+            if self.has_journal:
+                self._replay_journal()
+            if batch:
+                self._write(batch)
+            self.in_flight = []
+
+        if self.conn is not None:
+            release(self.conn)
+
+    def _db(self):
+        # Persistent connection, (re)opened on demand; None while the DB is down
+        if self.abandoned or time.monotonic() < self.retry_after:
+            return None
+        if self.conn is not None and self.conn.closed:
+            release(self.conn, broken=True)
+            self.conn = None
+        if self.conn is None:
+            try:
+                self.conn = checkout()
+                create_tables(self.conn)
+            except psycopg2.Error as e:
+                print(f"[DB] Not available, keeping results offline: {e}")
+                self._drop_connection()
+                return None
+        return self.conn
+
+    def _drop_connection(self):
+        if self.conn is not None:
+            release(self.conn, broken=True)
+        self.conn = None
+        self.retry_after = time.monotonic() + DB_RETRY_SECONDS
+
+    def _write(self, batch):
+        conn = self._db()
+        if conn is not None:
+            try:
+                self._insert(batch)
+                return
+            except CONNECTION_ERRORS as e:
+                print(f"[DB] Could not save {len(batch)} result(s): {e}")
+                self._drop_connection()
+        self._journal(batch)
+
+    def _insert(self, batch):
+        # Only connection errors get out of here (the DB is down). A data error
+        # fails the whole batch, so its rows are then tried one by one and the
+        # ones the DB refuses go to the reject file instead of being retried forever.
+        try:
+            insert_results(self.conn, batch)
+            return
+        except CONNECTION_ERRORS:
+            raise
+        except psycopg2.Error:
+            self.conn.rollback()
+        for row in batch:
+            try:
+                insert_results(self.conn, [row])
+            except CONNECTION_ERRORS:
+                raise
+            except psycopg2.Error as e:
+                self.conn.rollback()
+                print(f"[DB] Result rejected, moved to {REJECT_FILE.name}: {e}")
+                journal_append([row], REJECT_FILE)
+
+    def _journal(self, batch):
+        with self.journal_lock:
+            journal_append(batch)
+            self.has_journal = True
+
+    def _replay_journal(self):
+        if self._db() is None:
+            return
+        with self.journal_lock:
+            rows = journal_read()
+            size = JOURNAL_FILE.stat().st_size if JOURNAL_FILE.exists() else 0
+        try:
+            for start in range(0, len(rows), self.batch_size):
+                self._insert(rows[start:start + self.batch_size])
+        except CONNECTION_ERRORS as e:
+            # Already committed batches are skipped next time thanks to client_id
+            print(f"[DB] Journal replay stopped: {e}")
+            self._drop_connection()
+            return
+        with self.journal_lock:
+            # Rows appended meanwhile stay; the replayed ones are skipped next time
+            current = JOURNAL_FILE.stat().st_size if JOURNAL_FILE.exists() else 0
+            if current == size:
+                journal_clear()
+                self.has_journal = False
+
+
+# -----------------------------------------------------------------------------
+# Read cache — menus show the last snapshot at once, a worker thread refreshes it
+# -----------------------------------------------------------------------------
+
+class StatsCache:
+    """Leaderboard and personal-best snapshots, refreshed in the background."""
+
+    def __init__(self, ttl=CACHE_TTL_SECONDS):
+        self.ttl       = ttl
+        self.lock      = threading.Lock()
+        self.board     = None   # last leaderboard rows, None until first fetch
+        self.board_at  = 0.0    # time.monotonic() of last successful fetch
+        self.bests     = {}     # username -> (best score, fetched at)
+        self.pending   = set()  # refresh keys queued or running
+        self.attempted = {}     # refresh key -> time of last attempt
+        self.requests  = queue.Queue()
+        self.thread    = threading.Thread(target=self._run, name="snake-db-reader", daemon=True)
+        self.thread.start()
+
+    def leaderboard(self):
+        # Returns (rows, stale) immediately; schedules a refresh when stale
+        with self.lock:
+            rows, fetched_at = self.board, self.board_at
+        stale = rows is None or time.monotonic() - fetched_at > self.ttl
+        if stale:
+            self._request("leaderboard")
+        return rows or [], stale
+
+    def personal_best(self, username):
+        # Returns (best score, stale) immediately; schedules a refresh when stale
+        with self.lock:
+            cached = self.bests.get(username)
+        stale = cached is None or time.monotonic() - cached[1] > self.ttl
+        if stale:
+            self._request(("best", username))
+        return (cached[0] if cached else 0), stale
+
+    def note_result(self, username, score):
+        # A finished game is known locally before the writer has saved it
+        with self.lock:
+            best, fetched_at = self.bests.get(username, (0, 0.0))
+            self.bests[username] = (max(best, score), fetched_at)
+            self.board_at = 0.0   # leaderboard may have changed
+
+    def _request(self, key):
+        now = time.monotonic()
+        with self.lock:
+            if key in self.pending or now - self.attempted.get(key, -CACHE_RETRY_SECONDS) < CACHE_RETRY_SECONDS:
+                return
+            self.pending.add(key)
+            self.attempted[key] = now
+        self.requests.put(key)
+
+    def _run(self):
+        while True:
+            key = self.requests.get()
+            try:
+                if key == "leaderboard":
+                    rows = get_leaderboard()
+                    with self.lock:
+                        self.board, self.board_at = rows, time.monotonic()
+                else:
+                    username = key[1]
+                    value = get_personal_best(username)
+                    with self.lock:
+                        # The DB may not have the latest local result yet
+                        local = self.bests.get(username, (0, 0.0))[0]
+                        self.bests[username] = (max(value, local), time.monotonic())
+            except Exception as e:
+                print(f"[DB] Refresh failed, showing cached data: {e}")
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
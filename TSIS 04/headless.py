@@ -0,0 +1,86 @@
+import argparse
+import random
+import statistics
+import time
+
+from autopilot import autopilot_policy
+from sim import DIRECTIONS, SnakeSim, is_opposite, is_wall
+
+# Runs many Snake games without a window, e.g. to check balance changes:
+#   python headless.py --games 5000 --policy greedy --seed 1
+#
+# One game at a time in plain Python with the full rules (poison, power-ups):
+# about a hundred games per second. For thousands of games per second use
+# batch_env.py, which plays them all at once with NumPy.
+
+
+def safe_moves(sim):
+    hx, hy = sim.snake[0]
+    moves = []
+    for d in DIRECTIONS.values():
+        if is_opposite(d, sim.direction):
+            continue
+        cell = (hx + d[0], hy + d[1])
+        if is_wall(cell) or cell in sim.snake_cells or cell in sim.obstacles:
+            continue
+        if sim.poison and cell == sim.poison["pos"]:
+            continue
+        moves.append((d, cell))
+    return moves
+
+
+def random_policy(sim, rng):
+    moves = safe_moves(sim)
+    return rng.choice(moves)[0] if moves else None
+
+
+def greedy_policy(sim, rng):
+    # Closest safe move to the food, ties broken at random
+    moves = safe_moves(sim)
+    if not moves:
+        return None
+    fx, fy = sim.food["pos"]
+    rng.shuffle(moves)
+    return min(moves, key=lambda m: abs(m[1][0] - fx) + abs(m[1][1] - fy))[0]
+
+
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "autopilot": autopilot_policy,
+}
+
+
+def play(seed, policy, max_steps):
+    sim = SnakeSim(seed)
+    rng = random.Random(seed)
+    while not sim.game_over and sim.ticks < max_steps:
+        sim.step(policy(sim, rng))
+    return {**sim.result(), "steps": sim.ticks, "length": len(sim.snake)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Snake games headlessly")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game; game i uses seed + i.")
+    parser.add_argument("--policy", choices=list(POLICIES), default="greedy")
+    parser.add_argument("--max-steps", type=int, default=5000, help="Stop a game after this many moves.")
+    args = parser.parse_args()
+
+    policy  = POLICIES[args.policy]
+    start   = time.perf_counter()
+    results = [play(args.seed + i, policy, args.max_steps) for i in range(args.games)]
+    elapsed = time.perf_counter() - start
+
+    scores = [r["score"] for r in results]
+    levels = [r["level"] for r in results]
+    steps  = sum(r["steps"] for r in results)
+    print(f"{args.games} games ({args.policy}) in {elapsed:.2f}s: "
+          f"{args.games / elapsed:.0f} games/s, {steps / elapsed:.0f} moves/s")
+    print(f"score  mean {statistics.mean(scores):.2f}  median {statistics.median(scores)}  max {max(scores)}")
+    print(f"level  mean {statistics.mean(levels):.2f}  max {max(levels)}")
+    print(f"moves  mean {steps / args.games:.1f}")
+
+
+if __name__ == "__main__":
+    main()
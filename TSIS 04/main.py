@@ -1,9 +1,11 @@
 import sys
+import uuid
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 import pygame
 import db
+import replay
 from config import load_settings, save_settings, WINDOW_WIDTH, WINDOW_HEIGHT
 from game import SnakeGame
 
@@ -51,7 +53,7 @@ def show_main_menu(screen, db_ok):
     # Username input (shown below the title)
     username_buf  = ""
     input_rect    = pygame.Rect(cx - 140, 160, 280, 44)
-    db_label      = "DB: connected" if db_ok else "DB: offline (scores not saved)"
+    db_label      = "DB: connected" if db_ok else "DB: offline (scores kept locally)"
     db_color      = (60, 210, 100) if db_ok else (220, 100, 50)
 
     clock = pygame.time.Clock()
@@ -182,21 +184,16 @@ def show_settings(screen, settings):
         clock.tick(60)
 
 
-def show_leaderboard(screen, db_ok):
+def show_leaderboard(screen, db_ok, stats):
     fonts    = make_fonts()
     W, H     = screen.get_size()
     cx       = W // 2
     back_btn = pygame.Rect(cx - 100, H - 60, 200, 46)
 
-    entries = []
-    if db_ok:
-        try:
-            entries = db.get_leaderboard()
-        except Exception:
-            db_ok = False
-
     clock = pygame.time.Clock()
     while True:
+        # Cached snapshot; picks up the background refresh as soon as it lands
+        entries, stale = stats.leaderboard()
         mx, my = pygame.mouse.get_pos()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -217,8 +214,17 @@ def show_leaderboard(screen, db_ok):
             screen.blit(fonts["small"].render(h, True, DIM), (x, 110))
         pygame.draw.line(screen, DIM, (15, 133), (W - 15, 133), 1)
 
-        if not db_ok or not entries:
-            msg = "DB offline — no scores available" if not db_ok else "No scores yet"
+        if stale and entries:
+            note = fonts["tiny"].render("cached — refreshing…", True, DIM)
+            screen.blit(note, note.get_rect(topright=(W - 15, 92)))
+
+        if not entries:
+            if not db_ok:
+                msg = "DB offline — no scores available"
+            elif stale:
+                msg = "Loading…"
+            else:
+                msg = "No scores yet"
             screen.blit(fonts["mid"].render(msg, True, DIM),
                         fonts["mid"].render(msg, True, DIM).get_rect(center=(cx, 350)))
         else:
@@ -234,7 +240,10 @@ def show_leaderboard(screen, db_ok):
         clock.tick(60)
 
 
-def show_game_over(screen, result, personal_best):
+def show_game_over(screen, result, stats=None, username="", session_best=0):
+    # The personal best is read from the cache every frame, so a refresh that
+    # lands while this screen is open replaces "syncing…" with the DB value.
+    # Without the DB it is the best score of this session.
     fonts    = make_fonts()
     W, H     = screen.get_size()
     cx       = W // 2
@@ -258,6 +267,11 @@ def show_game_over(screen, result, personal_best):
                 if menu_btn.collidepoint(mx, my):
                     return "menu"
 
+        if stats is not None and username:
+            personal_best, best_stale = stats.personal_best(username)
+        else:
+            personal_best, best_stale = session_best, False
+
         screen.fill(BG)
         screen.blit(fonts["title"].render("GAME OVER", True, RED),
                     fonts["title"].render("GAME OVER", True, RED).get_rect(center=(cx, 190)))
@@ -265,7 +279,7 @@ def show_game_over(screen, result, personal_best):
         lines = [
             f"Score:        {result['score']}",
             f"Level reached: {result['level']}",
-            f"Personal best: {personal_best}",
+            f"Personal best: {personal_best}" + ("  (syncing…)" if best_stale else ""),
         ]
         for i, line in enumerate(lines):
             s = fonts["mid"].render(line, True, WHITE)
@@ -295,32 +309,45 @@ def main():
     except Exception as e:
         print(f"[DB] Not available: {e}")
 
+    # Writes to the DB, or to the offline journal while it is unreachable
+    writer = db.ResultWriter()
+    stats  = db.StatsCache()
+
     username = ""
     state    = "menu"
+    session_bests = {}   # username -> best score this session, for when the DB is offline
 
     while state != "quit":
         if state == "menu":
+            if db_ok:
+                stats.leaderboard()   # warm the cache while the player types a name
             state, username = show_main_menu(screen, db_ok)
+            if db_ok and username:
+                stats.personal_best(username)   # fetched while the game starts
 
         elif state == "play":
-            personal_best = 0
+            personal_best = session_bests.get(username, 0)
             if db_ok and username:
-                try:
-                    personal_best = db.get_personal_best(username)
-                except Exception:
-                    pass
+                personal_best, _ = stats.personal_best(username)
 
             game   = SnakeGame(screen, settings, username, personal_best, db_ok)
             result = game.run()
 
-            if db_ok and username:
-                try:
-                    db.save_result(username, result["score"], result["level"])
-                    personal_best = db.get_personal_best(username)
-                except Exception:
-                    pass
-
-            after = show_game_over(screen, result, personal_best)
+            # The replay file shares the session's client_id, so a saved score can be audited
+            client_id = str(uuid.uuid4())
+            try:
+                replay.save(game.replay_data(), client_id)
+            except OSError as e:
+                print(f"[Replay] Not saved: {e}")
+
+            # Saved by the background writer; the new best is known without asking the DB
+            if username:
+                writer.submit(username, result["score"], result["level"], client_id)
+                stats.note_result(username, result["score"])
+
+            session_bests[username] = max(session_bests.get(username, 0), result["score"])
+            after = show_game_over(screen, result, stats if db_ok else None, username,
+                                   session_bests[username])
             if after == "retry":
                 state = "play"
             elif after == "menu":
@@ -329,7 +356,7 @@ def main():
                 state = "quit"
 
         elif state == "leaderboard":
-            state = show_leaderboard(screen, db_ok)
+            state = show_leaderboard(screen, db_ok, stats)
 
         elif state == "settings":
             new_s = show_settings(screen, settings)
@@ -338,6 +365,8 @@ def main():
                 save_settings(settings)
             state = "menu"
 
+    writer.close()
+    db.close_pool()
     pygame.quit()
 
 
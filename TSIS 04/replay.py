@@ -0,0 +1,192 @@
+import argparse
+import os
+from pathlib import Path
+
+from config import REPLAY_DIR
+from sim import DIRECTIONS, SnakeSim
+
+# Game replays: the sim is deterministic, so a seed plus the turns the player
+# made is the whole game. File layout (all numbers unsigned LEB128 varints):
+#
+#   b"SNKR" version seed ticks score level turn_count
+#   turn_count x ((ticks since previous turn << 2) | direction code)
+#
+# A typical game is well under 1 KB. Files are named after the session's
+# client_id in game_sessions, so a leaderboard row leads to its replay.
+
+MAGIC   = b"SNKR"
+VERSION = 1
+
+DIR_CODES = list(DIRECTIONS.values())          # code -> direction
+CODE_OF   = {d: i for i, d in enumerate(DIR_CODES)}
+
+
+def write_varint(out, value):
+    while True:
+        byte  = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def read_varint(data, pos):
+    value, shift = 0, 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+class Recorder:
+    def __init__(self, seed):
+        self.seed  = seed
+        self.turns = []   # (tick, direction) for ticks that had an input
+
+    def record(self, tick, action):
+        if action is not None:
+            self.turns.append((tick, action))
+
+    def encode(self, ticks, result):
+        out = bytearray(MAGIC)
+        for value in (VERSION, self.seed, ticks, result["score"], result["level"], len(self.turns)):
+            write_varint(out, value)
+        last = 0
+        for tick, action in self.turns:
+            write_varint(out, (tick - last) << 2 | CODE_OF[action])
+            last = tick
+        return bytes(out)
+
+
+def decode(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a Snake replay")
+    pos = len(MAGIC)
+    version, pos = read_varint(data, pos)
+    if version != VERSION:
+        raise ValueError(f"unsupported replay version {version}")
+    header = []
+    for _ in range(5):
+        value, pos = read_varint(data, pos)
+        header.append(value)
+    seed, ticks, score, level, count = header
+
+    turns, tick = {}, 0
+    for _ in range(count):
+        value, pos = read_varint(data, pos)
+        tick += value >> 2
+        turns[tick] = DIR_CODES[value & 3]
+    return {"seed": seed, "ticks": ticks, "score": score, "level": level, "turns": turns}
+
+
+def simulate(replay, until=None):
+    # Re-run the game without drawing anything; `until` stops at that tick
+    sim   = SnakeSim(replay["seed"])
+    turns = replay["turns"]
+    end   = replay["ticks"] if until is None else min(until, replay["ticks"])
+    while sim.ticks < end and not sim.game_over:
+        sim.step(turns.get(sim.ticks))
+    return sim
+
+
+def verify(replay):
+    # True when re-simulating gives the score and level that were saved
+    sim = simulate(replay)
+    return sim.result() == {"score": replay["score"], "level": replay["level"]}
+
+
+def replay_path(client_id, directory=REPLAY_DIR):
+    return Path(directory) / f"{client_id}.snr"
+
+
+def save(data, client_id, directory=REPLAY_DIR):
+    # Write to a temp file first so a crash never leaves half a replay
+    path = replay_path(client_id, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return path
+
+
+def load(path_or_id, directory=REPLAY_DIR):
+    path = Path(path_or_id)
+    if not path.exists():
+        path = replay_path(path_or_id, directory)
+    return decode(path.read_bytes())
+
+
+# -----------------------------------------------------------------------------
+# Window playback
+# -----------------------------------------------------------------------------
+
+def watch(replay, speed=1.0, start=0):
+    # Plays the game in a window, `speed` times faster than it was played.
+    # Only one frame is drawn per display refresh; the ticks in between are
+    # simulated but never rendered, so high speeds cost almost nothing.
+    import pygame
+    from config import load_settings, WINDOW_WIDTH, WINDOW_HEIGHT, RENDER_FPS, MAX_FRAME_MS
+    from game import SnakeGame
+
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Snake replay")
+    game  = SnakeGame(screen, load_settings(), "", replay["score"], False, seed=replay["seed"])
+    sim   = game.sim
+    turns = replay["turns"]
+    while sim.ticks < start and not sim.game_over:
+        sim.step(turns.get(sim.ticks))
+
+    accumulator = 0.0
+    running     = True
+    game.clock.tick()
+    while running:
+        frame_ms = min(game.clock.tick(RENDER_FPS), MAX_FRAME_MS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN
+                                             and event.key == pygame.K_ESCAPE):
+                running = False
+
+        accumulator += frame_ms * speed
+        while sim.ticks < replay["ticks"] and not sim.game_over and accumulator >= sim.step_ms():
+            accumulator -= sim.step_ms()
+            game.prev_snake = list(sim.snake)
+            sim.step(turns.get(sim.ticks))
+
+        finished = sim.game_over or sim.ticks >= replay["ticks"]
+        game.draw(1.0 if finished else min(1.0, accumulator / sim.step_ms()))
+        pygame.display.flip()
+        if finished:
+            pygame.time.wait(1500)
+            running = False
+    pygame.quit()
+    return sim.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or watch a Snake replay")
+    parser.add_argument("replay", help="Replay file or session client_id.")
+    parser.add_argument("--watch", action="store_true", help="Play it back in a window.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed for --watch.")
+    parser.add_argument("--start", type=int, default=0, help="Skip to this tick before watching.")
+    args = parser.parse_args()
+
+    replay = load(args.replay)
+    sim    = simulate(replay)
+    status = "OK" if verify(replay) else "MISMATCH"
+    print(f"seed {replay['seed']}, {replay['ticks']} ticks, {len(replay['turns'])} turns")
+    print(f"saved score {replay['score']} level {replay['level']} | "
+          f"re-simulated score {sim.score} level {sim.level}: {status}")
+    if args.watch:
+        watch(replay, args.speed, args.start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+import random
+from collections import deque
+
+from config import (GRID_COLS, GRID_ROWS, BASE_SPEED, FOODS_PER_LEVEL,
+                    FOOD_LIFETIME_MS, POWERUP_LIFETIME_MS, POWERUP_EFFECT_MS,
+                    OBSTACLE_COUNT)
+
+# Snake rules without pygame: no clock, no window, no global random state.
+# Time is the simulated clock `now` (ms), advanced by one move's duration at
+# the current speed on every step(), so a game can run as fast as the CPU
+# allows and a seed always replays the same game.
+
+DIRECTIONS = {
+    "left":  (-1, 0),
+    "right": (1, 0),
+    "up":    (0, -1),
+    "down":  (0, 1),
+}
+
+FOOD_KINDS = [
+    (1, (230, 70,  70)),
+    (2, (255, 170, 40)),
+    (3, (180, 80, 255)),
+]
+POWERUP_KINDS = ["speed_boost", "slow_motion", "shield"]
+
+MIN_REACHABLE_CELLS = 8   # obstacles never leave the head fewer free cells than this
+
+
+def is_wall(cell):
+    x, y = cell
+    return x == 0 or y == 0 or x == GRID_COLS - 1 or y == GRID_ROWS - 1
+
+
+def is_opposite(a, b):
+    return a[0] == -b[0] and a[1] == -b[1]
+
+
+# Interior cells not covered by the snake, obstacles or field items.
+# A list plus a cell -> list index map: remove swaps the last cell into the
+# hole, so add, remove and random choice are all O(1) on any grid size.
+class FreeCells:
+    def __init__(self, cols=GRID_COLS, rows=GRID_ROWS):
+        self.cols  = cols
+        self.rows  = rows
+        self.cells = [(x, y) for x in range(1, cols - 1) for y in range(1, rows - 1)]
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+
+    def add(self, cell):
+        x, y = cell
+        if cell in self.index or not (0 < x < self.cols - 1 and 0 < y < self.rows - 1):
+            return
+        self.index[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    def remove(self, cell):
+        i = self.index.pop(cell, None)
+        if i is None:
+            return
+        last = self.cells.pop()
+        if i < len(self.cells):
+            self.cells[i] = last
+            self.index[last] = i
+
+    def choice(self, rng):
+        return rng.choice(self.cells) if self.cells else None
+
+
+def reachable_cells(head, obstacles, snake_cells, limit, cols=GRID_COLS, rows=GRID_ROWS):
+    # BFS from head over cells that are neither wall, obstacle nor snake.
+    # Stops once `limit` cells are found: callers only need "at least limit"
+    visited = {head}
+    queue   = deque([head])
+    while queue and len(visited) < limit:
+        x, y = queue.popleft()
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nb = (x + dx, y + dy)
+            if (0 < nb[0] < cols - 1 and 0 < nb[1] < rows - 1 and nb not in visited
+                    and nb not in obstacles and nb not in snake_cells):
+                visited.add(nb)
+                queue.append(nb)
+    return visited
+
+
+def place_obstacles(rng, free, head, snake_cells, count, min_region=MIN_REACHABLE_CELLS,
+                    max_tries=None):
+    # Take up to `count` cells out of `free` as obstacles so the head can
+    # still reach at least `min_region` cells. The last BFS region is reused:
+    # an obstacle outside it cannot cut any of its paths, so the BFS only
+    # reruns when a candidate lands inside the region it found.
+    obstacles = set()
+    region    = reachable_cells(head, obstacles, snake_cells, min_region, free.cols, free.rows)
+    if len(region) < min_region:
+        return obstacles
+
+    tries = max_tries if max_tries is not None else 4 * count + 16
+    while len(obstacles) < count and tries > 0:
+        tries -= 1
+        cell = free.choice(rng)
+        if cell is None:
+            break
+        if cell in region:
+            obstacles.add(cell)
+            trial = reachable_cells(head, obstacles, snake_cells, min_region, free.cols, free.rows)
+            if len(trial) < min_region:
+                obstacles.discard(cell)
+                continue
+            region = trial
+        else:
+            obstacles.add(cell)
+        free.remove(cell)
+    return obstacles
+
+
+class SnakeSim:
+    def __init__(self, seed=None):
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed
+        self.rng  = random.Random(seed)
+        self.now  = 0    # simulated ms since the start of the game
+        self.ticks = 0   # number of step() calls
+
+        sx, sy = GRID_COLS // 2, GRID_ROWS // 2
+        # Body as a deque (O(1) push/pop at both ends) plus the same cells as a
+        # set for O(1) collision checks; _push_head/_pop_tail keep them in sync
+        self.snake         = deque([(sx, sy), (sx - 1, sy), (sx - 2, sy)])
+        self.snake_cells   = set(self.snake)
+        self.free          = FreeCells()   # updated on every move, spawn and pickup
+        for cell in self.snake:
+            self.free.remove(cell)
+        self.direction     = (1, 0)
+        self.score         = 0
+        self.level         = 1
+        self.speed         = BASE_SPEED
+        self.obstacles     = set()
+        self.layout_rev    = 0      # bumped whenever obstacles change
+        self.poison        = None
+
+        self.food          = self._make_food()
+        self.poison_timer  = self.now + self.rng.randint(5000, 10000)
+
+        # Power-up on the field (only one at a time)
+        self.field_powerup = None   # {"pos", "kind", "spawn_time"}
+        self.pu_spawn_time = self.now + self.rng.randint(8000, 15000)
+
+        # Active power-up effect
+        self.active_pu     = None   # "speed_boost" | "slow_motion" | "shield"
+        self.pu_end_time   = 0
+
+        self.shield_ready  = False  # shield lasts until one collision
+        self.game_over     = False
+
+    def step_ms(self):
+        # How long one move lasts at the current speed (moves per second)
+        return 1000 // self.speed
+
+    def result(self):
+        return {"score": self.score, "level": self.level}
+
+    def _push_head(self, cell):
+        self.snake.appendleft(cell)
+        self.snake_cells.add(cell)
+        self.free.remove(cell)
+
+    def _pop_tail(self):
+        tail = self.snake.pop()
+        self.snake_cells.discard(tail)
+        self.free.add(tail)
+
+    # -------------------------------------------------------------------------
+    # Food / poison / power-up generation
+    # -------------------------------------------------------------------------
+
+    def _take_free_cell(self):
+        cell = self.free.choice(self.rng)
+        if cell is not None:
+            self.free.remove(cell)
+        return cell
+
+    def _release(self, cell):
+        # An item left this cell; it is free again unless the snake is on it now
+        if cell not in self.snake_cells and cell not in self.obstacles:
+            self.free.add(cell)
+
+    def _make_food(self):
+        pos = self._take_free_cell() or (1, 1)
+        weight, color = self.rng.choice(FOOD_KINDS)
+        return {"pos": pos, "weight": weight, "color": color, "spawn_time": self.now}
+
+    def _respawn_food(self):
+        self._release(self.food["pos"])
+        self.food = self._make_food()
+
+    def _make_poison(self):
+        pos = self._take_free_cell()
+        if pos is None:
+            return None
+        return {"pos": pos, "spawn_time": self.now}
+
+    def _make_field_powerup(self):
+        pos = self._take_free_cell()
+        if pos is None:
+            return None
+        kind = self.rng.choice(POWERUP_KINDS)
+        return {"pos": pos, "kind": kind, "spawn_time": self.now}
+
+    def _make_obstacles(self):
+        # Place OBSTACLE_COUNT random blocks without trapping the snake
+        old, self.obstacles = self.obstacles, set()
+        for cell in old:
+            self._release(cell)
+
+        self.obstacles   = place_obstacles(self.rng, self.free, self.snake[0],
+                                           self.snake_cells, OBSTACLE_COUNT)
+        self.layout_rev += 1
+
+    # -------------------------------------------------------------------------
+    # Level / speed
+    # -------------------------------------------------------------------------
+
+    def _update_level(self):
+        new_level = 1 + self.score // FOODS_PER_LEVEL
+        if new_level != self.level:
+            self.level = new_level
+            self.speed = BASE_SPEED + (self.level - 1) * 2
+            if self.level >= 3:
+                self._make_obstacles()
+
+    # -------------------------------------------------------------------------
+    # Active power-up helpers
+    # -------------------------------------------------------------------------
+
+    def _apply_powerup(self, kind):
+        self.active_pu   = kind
+        self.pu_end_time = self.now + POWERUP_EFFECT_MS
+        if kind == "speed_boost":
+            self.speed = min(self.speed + 4, BASE_SPEED + 20)
+        elif kind == "slow_motion":
+            self.speed = max(1, self.speed - 3)
+        elif kind == "shield":
+            self.shield_ready = True
+            self.active_pu    = None  # shield has no timed expiry
+
+    def _check_powerup_expiry(self):
+        if self.active_pu in ("speed_boost", "slow_motion"):
+            if self.now >= self.pu_end_time:
+                # Revert speed to what it should be for the current level
+                self.speed    = BASE_SPEED + (self.level - 1) * 2
+                self.active_pu = None
+
+    # -------------------------------------------------------------------------
+    # One move
+    # -------------------------------------------------------------------------
+
+    def step(self, action=None):
+        # action: a direction tuple (or None to keep going straight); a direct
+        # reversal is ignored. Returns the events of this move ("eat",
+        # "poison", "powerup", "gameover") so a front end can play sounds.
+        events = []
+        if self.game_over:
+            return events
+
+        self.now   += self.step_ms()
+        self.ticks += 1
+        now = self.now
+
+        # Rotate food if timer expired
+        if now - self.food["spawn_time"] >= FOOD_LIFETIME_MS:
+            self._respawn_food()
+
+        # Spawn poison food after its random delay
+        if self.poison is None and now >= self.poison_timer:
+            self.poison = self._make_poison()
+
+        # Remove poison if it has been on the field too long
+        if self.poison and now - self.poison["spawn_time"] >= FOOD_LIFETIME_MS:
+            self._release(self.poison["pos"])
+            self.poison = None
+            self.poison_timer = now + self.rng.randint(5000, 10000)
+
+        # Spawn a field power-up if none is on the field
+        if self.field_powerup is None and now >= self.pu_spawn_time:
+            self.field_powerup = self._make_field_powerup()
+
+        # Expire field power-up if not collected in time
+        if self.field_powerup and now - self.field_powerup["spawn_time"] >= POWERUP_LIFETIME_MS:
+            self._release(self.field_powerup["pos"])
+            self.field_powerup = None
+            self.pu_spawn_time = now + self.rng.randint(8000, 15000)
+
+        self._check_powerup_expiry()
+
+        # Move snake
+        if action is not None and not is_opposite(action, self.direction):
+            self.direction = action
+        hx, hy = self.snake[0]
+        dx, dy  = self.direction
+        new_head = (hx + dx, hy + dy)
+
+        # Collision with wall or self
+        if is_wall(new_head) or new_head in self.snake_cells or new_head in self.obstacles:
+            if self.shield_ready:
+                # Shield absorbs the collision; snake stays put this tick
+                self.shield_ready = False
+                return events
+            events.append("gameover")
+            self.game_over = True
+            return events
+
+        self._push_head(new_head)
+
+        # Eat normal food
+        if new_head == self.food["pos"]:
+            events.append("eat")
+            self.score += self.food["weight"]
+            self._update_level()
+            self._respawn_food()
+        # Eat poison
+        elif self.poison and new_head == self.poison["pos"]:
+            events.append("poison")
+            self.poison = None
+            self.poison_timer = now + self.rng.randint(5000, 10000)
+            # Shrink snake by 2; game over if too short
+            for _ in range(2):
+                if len(self.snake) > 1:
+                    self._pop_tail()
+            if len(self.snake) <= 1:
+                events.append("gameover")
+                self.game_over = True
+        # Collect power-up
+        elif self.field_powerup and new_head == self.field_powerup["pos"]:
+            events.append("powerup")
+            self._apply_powerup(self.field_powerup["kind"])
+            self.field_powerup = None
+            self.pu_spawn_time = now + self.rng.randint(8000, 15000)
+        else:
+            self._pop_tail()
+
+        return events